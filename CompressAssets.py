@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Write pre-compressed <file>.gz siblings for everything serve.py sends often:
+index.html, app.js, styles.css and every file under decks/.
+serve.py picks the .gz copy when the browser accepts gzip and the copy is not
+older than the original.
+
+Run after regenerating decks (only stale or missing .gz files are rewritten):
+  python CompressAssets.py
+"""
+
+import gzip, os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS = ["index.html", "app.js", "styles.css"]
+DECKS = os.path.join(ROOT, "decks")
+
+def targets():
+    for name in ASSETS:
+        yield os.path.join(ROOT, name)
+    for dirpath, _, files in os.walk(DECKS):
+        for name in sorted(files):
+            if name.endswith(".json"):
+                yield os.path.join(dirpath, name)
+
+def compress(path):
+    """Write path + '.gz' if missing or stale; return (raw bytes, gz bytes, written)."""
+    gz_path = path + ".gz"
+    raw = os.path.getsize(path)
+    if os.path.exists(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path):
+        return raw, os.path.getsize(gz_path), False
+    with open(path, "rb") as f:
+        data = gzip.compress(f.read(), 9, mtime=0)
+    tmp = gz_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, gz_path)
+    return raw, len(data), True
+
+if __name__ == "__main__":
+    total_raw = total_gz = written = 0
+    for path in targets():
+        raw, gz, w = compress(path)
+        total_raw += raw; total_gz += gz; written += w
+    print(f"{written} .gz files written; {total_raw} bytes -> {total_gz} bytes gzipped "
+          f"({total_gz / max(total_raw, 1):.1%}).")
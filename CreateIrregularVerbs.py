@@ -16,15 +16,19 @@ apparire, scomparire, finire, avere, essere
 
 Writes into:  decks/fr-it/<french_lemma_ascii>.json
 Merges into:  decks/fr-it/index.json
+Updates:      decks/fr-it/manifest.json, decks/fr-it/tenses/*.json
+(only files whose content changed are rewritten; --force regenerates every verb;
+--defer-index only queues the files for `python deckbuild.py`, to run several generators at once;
+--profile[=PATH] reports time and memory per build phase and per tense, see buildprofile.py)
 """
 
-import json, os
+import os, sys
 
-DECK_DIR = os.path.join("decks", "fr-it")
-os.makedirs(DECK_DIR, exist_ok=True)
+from conjugation import Verb
+from buildprofile import profile_path, profiling
+from deckbuild import generate
 
-FR_PRONOUNS = ["je", "tu", "il/elle", "nous", "vous", "ils/elles"]
-IT_PRONOUNS = ["io", "tu", "lui/lei", "noi", "voi", "loro"]
+DECK_DIR = os.path.join("decks", "fr-it")
 
 VERBS = [
     "andare","fare","dare","stare","bere","sapere","tenere","ottenere","mantenere","ritenere","sostenere","trattenere",
@@ -120,8 +124,6 @@ PRES_IND = {
     "essere": ["sono","sei","è","siamo","siete","sono"],
 }
 
-def with_pronouns(forms): return [f"{p} {f}" for p,f in zip(IT_PRONOUNS, forms)]
-
 # Futuro/Condizionale stems
 FUT_STEM = {
     "andare":"andr","fare":"far","dare":"dar","stare":"star","bere":"berr","sapere":"sapr",
@@ -132,14 +134,8 @@ FUT_STEM = {
     "uscire":"uscir","dire":"dir","predire":"predir","disdire":"disdir","venire":"verr","salire":"salir",
     "apparire":"apparir","scomparire":"scomparir","finire":"finir","avere":"avr","essere":"sar"
 }
-def futuro_semplice(v):
-    r = FUT_STEM[v]; ends = ["ò","ai","à","emo","ete","anno"]
-    return with_pronouns([r+e for e in ends])
-def condizionale_presente(v):
-    r = FUT_STEM[v]; ends = ["ei","esti","ebbe","emmo","este","ebbero"]
-    return with_pronouns([r+e for e in ends])
 
-# Passato remoto (no pronouns)
+# Passato remoto (no pronouns); others: regular -are/-ere/-ire endings
 REMOTO = {
     "fare": ["feci","facesti","fece","facemmo","faceste","fecero"],
     "dare": ["diedi","desti","diede","demmo","deste","diedero"],
@@ -178,19 +174,6 @@ REMOTO = {
     "scomparire": ["scomparvi","scomparisti","scomparve","scomparimmo","scompariste","scomparvero"],
     "finire": ["finii","finisti","finì","finimmo","finiste","finirono"],
 }
-def passato_remoto(v):
-    if v in REMOTO:
-        return with_pronouns(REMOTO[v])
-    # default regular
-    if v.endswith("are"):
-        forms = ["ai","asti","ò","ammo","aste","arono"]
-    elif v.endswith("ere"):
-        forms = ["ei","esti","é","emmo","este","erono"]
-    else: # ire
-        forms = ["ii","isti","ì","immo","iste","irono"]
-    base = v[:-3]
-    return with_pronouns([base+e for e in forms])
-
 # Participio passato
 PP = {
     "andare":"andato","fare":"fatto","dare":"dato","stare":"stato","bere":"bevuto","sapere":"saputo",
@@ -203,129 +186,109 @@ PP = {
     "finire":"finito","avere":"avuto","essere":"stato"
 }
 
-# Imperfetto stems (special); default: verb[:-3]
+# Imperfetto: full forms (essere) or special stems; default stem: verb[:-3]
+IMPERFETTO = {
+    "essere": ["ero","eri","era","eravamo","eravate","erano"],
+}
 IMPF_STEM = {
     "fare":"face","dire":"dice","bere":"beve",
     "porre":"pone","proporre":"propone","esporre":"espone","opporre":"oppone",
     "condurre":"conduce","tradurre":"traduce","produrre":"produce","introdurre":"introduce",
 }
-def imperfetto(v):
-    if v == "essere":
-        forms = ["ero","eri","era","eravamo","eravate","erano"]
-        return with_pronouns(forms)
-    base = IMPF_STEM.get(v, v[:-3])
-    ends = ["vo","vi","va","vamo","vate","vano"]
-    return with_pronouns([base+e for e in ends])
 
-# Congiuntivo Presente
-def cong_pres(v):
-    if v == "avere":  return ["abbia","abbia","abbia","abbiamo","abbiate","abbiano"]
-    if v == "essere": return ["sia","sia","sia","siamo","siate","siano"]
-    mapping = {
-        "andare":["vada","vada","vada","andiamo","andiate","vadano"],
-        "dare":["dia","dia","dia","diamo","diate","diano"],
-        "stare":["stia","stia","stia","stiamo","stiate","stiano"],
-        "fare":["faccia","faccia","faccia","facciamo","facc iate".replace(" ",""),"facciano"],
-        "bere":["beva","beva","beva","beviamo","beviate","bevano"],
-        "sapere":["sappia","sappia","sappia","sappiamo","sappiate","sappiano"],
-        "tenere":["tenga","tenga","tenga","teniamo","teniate","tengano"],
-        "ottenere":["ottenga","ottenga","ottenga","otteniamo","otteniate","ottengano"],
-        "mantenere":["mantenga","mantenga","mantenga","manteniamo","manteniate","mantengano"],
-        "ritenere":["ritenga","ritenga","ritenga","riteniamo","riteniate","ritengano"],
-        "sostenere":["sostenga","sostenga","sostenga","sosteniamo","sosteniate","sostengano"],
-        "trattenere":["trattenga","trattenga","trattenga","tratteniamo","tratteniate","trattengano"],
-        "rimanere":["rimanga","rimanga","rimanga","rimaniamo","rimaniate","rimangano"],
-        "scegliere":["scelga","scelga","scelga","scegliamo","scegliate","scelgano"],
-        "togliere":["tolga","tolga","tolga","togliamo","togliate","tolgano"],
-        "cogliere":["colga","colga","colga","cogliamo","cogliate","colgano"],
-        "raccogliere":["raccolga","raccolga","raccolga","raccogliamo","raccogliate","raccolgano"],
-        "volere":["voglia","voglia","voglia","vogliamo","vogliate","vogliano"],
-        "condurre":["conduca","conduca","conduca","conduciamo","conduciate","conducano"],
-        "tradurre":["traduca","traduca","traduca","traduciamo","traduciate","traducano"],
-        "produrre":["produca","produca","produca","produciamo","produciate","producano"],
-        "introdurre":["introduca","introduca","introduca","introduciamo","introduciate","introducano"],
-        "porre":["ponga","ponga","ponga","poniamo","poniate","pongano"],
-        "proporre":["proponga","proponga","proponga","proponiamo","proponiate","propongano"],
-        "esporre":["esponga","esponga","esponga","esponiamo","esponiate","espongano"],
-        "opporre":["opponga","opponga","opponga","opponiamo","opponiate","oppongano"],
-        "uscire":["esca","esca","esca","usciamo","usciate","escano"],
-        "dire":["dica","dica","dica","diciamo","diciate","dicano"],
-        "predire":["predica","predica","predica","prediciamo","prediciate","predicano"],
-        "disdire":["disdica","disdica","disdica","disdiciamo","disdiciate","disdicano"],
-        "venire":["venga","venga","venga","veniamo","veniate","vengano"],
-        "salire":["salga","salga","salga","saliamo","salite","salgano"],
-        "apparire":["appaia","appaia","appaia","appariamo","appariate","appaiano"],
-        "scomparire":["scompaia","scompaia","scompaia","scompariamo","scompariate","scompaiano"],
-        "finire":["finisca","finisca","finisca","finiamo","finiate","finiscano"],
-    }
-    if v in mapping: return mapping[v]
-    pres1 = PRES_IND[v][0]
-    base = pres1[:-2] if pres1.endswith("go") else pres1[:-1]
-    return [base+"a",base+"a",base+"a",base+"iamo",base+"iate",base+"ano"]
-
-def congiuntivo_presente(v):
-    return [f"che {p} {f}" for p,f in zip(IT_PRONOUNS, cong_pres(v))]
+# Congiuntivo Presente (io..loro, without "che"/pronouns); others: stem of "io" presente + a/iamo/iate/ano
+CONG_PRES = {
+    "avere":["abbia","abbia","abbia","abbiamo","abbiate","abbiano"],
+    "essere":["sia","sia","sia","siamo","siate","siano"],
+    "andare":["vada","vada","vada","andiamo","andiate","vadano"],
+    "dare":["dia","dia","dia","diamo","diate","diano"],
+    "stare":["stia","stia","stia","stiamo","stiate","stiano"],
+    "fare":["faccia","faccia","faccia","facciamo","facciate","facciano"],
+    "bere":["beva","beva","beva","beviamo","beviate","bevano"],
+    "sapere":["sappia","sappia","sappia","sappiamo","sappiate","sappiano"],
+    "tenere":["tenga","tenga","tenga","teniamo","teniate","tengano"],
+    "ottenere":["ottenga","ottenga","ottenga","otteniamo","otteniate","ottengano"],
+    "mantenere":["mantenga","mantenga","mantenga","manteniamo","manteniate","mantengano"],
+    "ritenere":["ritenga","ritenga","ritenga","riteniamo","riteniate","ritengano"],
+    "sostenere":["sostenga","sostenga","sostenga","sosteniamo","sosteniate","sostengano"],
+    "trattenere":["trattenga","trattenga","trattenga","tratteniamo","tratteniate","trattengano"],
+    "rimanere":["rimanga","rimanga","rimanga","rimaniamo","rimaniate","rimangano"],
+    "scegliere":["scelga","scelga","scelga","scegliamo","scegliate","scelgano"],
+    "togliere":["tolga","tolga","tolga","togliamo","togliate","tolgano"],
+    "cogliere":["colga","colga","colga","cogliamo","cogliate","colgano"],
+    "raccogliere":["raccolga","raccolga","raccolga","raccogliamo","raccogliate","raccolgano"],
+    "volere":["voglia","voglia","voglia","vogliamo","vogliate","vogliano"],
+    "condurre":["conduca","conduca","conduca","conduciamo","conduciate","conducano"],
+    "tradurre":["traduca","traduca","traduca","traduciamo","traduciate","traducano"],
+    "produrre":["produca","produca","produca","produciamo","produciate","producano"],
+    "introdurre":["introduca","introduca","introduca","introduciamo","introduciate","introducano"],
+    "porre":["ponga","ponga","ponga","poniamo","poniate","pongano"],
+    "proporre":["proponga","proponga","proponga","proponiamo","proponiate","propongano"],
+    "esporre":["esponga","esponga","esponga","esponiamo","esponiate","espongano"],
+    "opporre":["opponga","opponga","opponga","opponiamo","opponiate","oppongano"],
+    "uscire":["esca","esca","esca","usciamo","usciate","escano"],
+    "dire":["dica","dica","dica","diciamo","diciate","dicano"],
+    "predire":["predica","predica","predica","prediciamo","prediciate","predicano"],
+    "disdire":["disdica","disdica","disdica","disdiciamo","disdiciate","disdicano"],
+    "venire":["venga","venga","venga","veniamo","veniate","vengano"],
+    "salire":["salga","salga","salga","saliamo","salite","salgano"],
+    "apparire":["appaia","appaia","appaia","appariamo","appariate","appaiano"],
+    "scomparire":["scompaia","scompaia","scompaia","scompariamo","scompariate","scompaiano"],
+    "finire":["finisca","finisca","finisca","finiamo","finiate","finiscano"],
+}
 
-# Congiuntivo Imperfetto
-def congiuntivo_imperfetto(v):
-    base_map = {
-        "andare":"andass","dare":"dess","stare":"stess","fare":"facess","dire":"dicess","bere":"bevess",
-        "sapere":"sapess","tenere":"teness","ottenere":"otteness","mantenere":"manteness","ritenere":"riteness",
-        "sostenere":"sosteness","trattenere":"tratteness","rimanere":"rimaness","volere":"voless",
-        "porre":"poness","proporre":"proponess","esporre":"esponess","opporre":"opponess",
-        "condurre":"conducess","tradurre":"traducess","produrre":"producess","introdurre":"introducess",
-        "scegliere":"scegliess","togliere":"togliess","cogliere":"cogliess","raccogliere":"raccogliess",
-        "uscire":"usciss","venire":"veniss","salire":"saliss","apparire":"appariss","scomparire":"scompariss",
-        "finire":"finiss","avere":"avess","essere":"foss","predire":"predicess","disdire":"disdicess",
-    }
-    base = base_map.get(v, v[:-3] + "ss")
-    ends = ["i","i","e","imo","te","ero"]  # -> andassi,andassi,andasse,andassimo,andaste,andassero
-    return [f"che {p} {base}{e}" for p,e in zip(IT_PRONOUNS, ends)]
+# Congiuntivo Imperfetto: stems before i/i/e/imo/te/ero (andassi...); others: verb[:-3] + "ss"
+CONG_IMPF_STEM = {
+    "andare":"andass","dare":"dess","stare":"stess","fare":"facess","dire":"dicess","bere":"bevess",
+    "sapere":"sapess","tenere":"teness","ottenere":"otteness","mantenere":"manteness","ritenere":"riteness",
+    "sostenere":"sosteness","trattenere":"tratteness","rimanere":"rimaness","volere":"voless",
+    "porre":"poness","proporre":"proponess","esporre":"esponess","opporre":"opponess",
+    "condurre":"conducess","tradurre":"traducess","produrre":"producess","introdurre":"introducess",
+    "scegliere":"scegliess","togliere":"togliess","cogliere":"cogliess","raccogliere":"raccogliess",
+    "uscire":"usciss","venire":"veniss","salire":"saliss","apparire":"appariss","scomparire":"scompariss",
+    "finire":"finiss","avere":"avess","essere":"foss","predire":"predicess","disdire":"disdicess",
+}
 
-# Imperativo
-def imperativo(v):
-    mp = {
-        "andare":["—","vai","vada","andiamo","andate","vadano"],
-        "dare":["—","dai","dia","diamo","date","diano"],
-        "stare":["—","stai","stia","stiamo","state","stiano"],
-        "fare":["—","fai","faccia","facciamo","fate","facciano"],
-        "bere":["—","bevi","beva","beviamo","bevete","bevano"],
-        "sapere":["—","sappi","sappia","sappiamo","sappiate","sappiano"],
-        "tenere":["—","tieni","tenga","teniamo","tenete","tengano"],
-        "ottenere":["—","ottieni","ottenga","otteniamo","ottenete","ottengano"],
-        "mantenere":["—","mantieni","mantenga","manteniamo","mantenete","mantengano"],
-        "ritenere":["—","ritieni","ritenga","riteniamo","ritenete","ritengano"],
-        "sostenere":["—","sostieni","sostenga","sosteniamo","sostenete","sostengano"],
-        "trattenere":["—","trattieni","trattenga","tratteniamo","trattenete","trattengano"],
-        "rimanere":["—","rimani","rimanga","rimaniamo","rimanete","rimangano"],
-        "scegliere":["—","scegli","scelga","scegliamo","scegliete","scelgano"],
-        "togliere":["—","togli","tolga","togliamo","togliete","tolgano"],
-        "cogliere":["—","cogli","colga","cogliamo","cogliete","colgano"],
-        "raccogliere":["—","raccogli","raccolga","raccogliamo","raccogliete","raccolgano"],
-        "volere":["—","vuoi","voglia","vogliamo","volete","vogliano"],
-        "condurre":["—","conduci","conduca","conduciamo","conducete","conducano"],
-        "tradurre":["—","traduci","traduca","traduciamo","traducete","traducano"],
-        "produrre":["—","produci","produca","produciamo","producete","producano"],
-        "introdurre":["—","introduci","introduca","introduciamo","introducete","introducano"],
-        "porre":["—","poni","ponga","poniamo","ponete","pongano"],
-        "proporre":["—","proponi","proponga","proponiamo","proponete","propongano"],
-        "esporre":["—","esponi","esponga","esponiamo","esponete","espongano"],
-        "opporre":["—","opponi","opponga","opponiamo","opponete","oppongano"],
-        "uscire":["—","esci","esca","usciamo","uscite","escano"],
-        "dire":["—","di'","dica","diciamo","dite","dicano"],
-        "predire":["—","predici","predica","prediciamo","predite","predicano"],
-        "disdire":["—","disdici","disdica","disdiciamo","disdite","disdicano"],
-        "venire":["—","vieni","venga","veniamo","venite","vengano"],
-        "salire":["—","sali","salga","saliamo","salite","salgano"],
-        "apparire":["—","appari","appaia","appariamo","apparite","appaiano"],
-        "scomparire":["—","scompari","scompaia","scompariamo","scomparite","scompaiano"],
-        "finire":["—","finisci","finisca","finiamo","finite","finiscano"],
-        "avere":["—","abbi","abbia","abbiamo","abbiate","abbiano"],
-        "essere":["—","sii","sia","siamo","siate","siano"],
-    }
-    if v in mp: return mp[v]
-    pres = PRES_IND[v]
-    return ["—", pres[1], pres[2], pres[3], pres[4], pres[5]]
+# Imperativo; others: "—" + presente tu..loro
+IMPERATIVO = {
+    "andare":["—","vai","vada","andiamo","andate","vadano"],
+    "dare":["—","dai","dia","diamo","date","diano"],
+    "stare":["—","stai","stia","stiamo","state","stiano"],
+    "fare":["—","fai","faccia","facciamo","fate","facciano"],
+    "bere":["—","bevi","beva","beviamo","bevete","bevano"],
+    "sapere":["—","sappi","sappia","sappiamo","sappiate","sappiano"],
+    "tenere":["—","tieni","tenga","teniamo","tenete","tengano"],
+    "ottenere":["—","ottieni","ottenga","otteniamo","ottenete","ottengano"],
+    "mantenere":["—","mantieni","mantenga","manteniamo","mantenete","mantengano"],
+    "ritenere":["—","ritieni","ritenga","riteniamo","ritenete","ritengano"],
+    "sostenere":["—","sostieni","sostenga","sosteniamo","sostenete","sostengano"],
+    "trattenere":["—","trattieni","trattenga","tratteniamo","trattenete","trattengano"],
+    "rimanere":["—","rimani","rimanga","rimaniamo","rimanete","rimangano"],
+    "scegliere":["—","scegli","scelga","scegliamo","scegliete","scelgano"],
+    "togliere":["—","togli","tolga","togliamo","togliete","tolgano"],
+    "cogliere":["—","cogli","colga","cogliamo","cogliete","colgano"],
+    "raccogliere":["—","raccogli","raccolga","raccogliamo","raccogliete","raccolgano"],
+    "volere":["—","vuoi","voglia","vogliamo","volete","vogliano"],
+    "condurre":["—","conduci","conduca","conduciamo","conducete","conducano"],
+    "tradurre":["—","traduci","traduca","traduciamo","traducete","traducano"],
+    "produrre":["—","produci","produca","produciamo","producete","producano"],
+    "introdurre":["—","introduci","introduca","introduciamo","introducete","introducano"],
+    "porre":["—","poni","ponga","poniamo","ponete","pongano"],
+    "proporre":["—","proponi","proponga","proponiamo","proponete","propongano"],
+    "esporre":["—","esponi","esponga","esponiamo","esponete","espongano"],
+    "opporre":["—","opponi","opponga","opponiamo","opponete","oppongano"],
+    "uscire":["—","esci","esca","usciamo","uscite","escano"],
+    "dire":["—","di'","dica","diciamo","dite","dicano"],
+    "predire":["—","predici","predica","prediciamo","predite","predicano"],
+    "disdire":["—","disdici","disdica","disdiciamo","disdite","disdicano"],
+    "venire":["—","vieni","venga","veniamo","venite","vengano"],
+    "salire":["—","sali","salga","saliamo","salite","salgano"],
+    "apparire":["—","appari","appaia","appariamo","apparite","appaiano"],
+    "scomparire":["—","scompari","scompaia","scompariamo","scomparite","scompaiano"],
+    "finire":["—","finisci","finisca","finiamo","finite","finiscano"],
+    "avere":["—","abbi","abbia","abbiamo","abbiate","abbiano"],
+    "essere":["—","sii","sia","siamo","siate","siano"],
+}
 
 # Gerundio (key exceptions)
 GERUND_EX = {
@@ -333,109 +296,19 @@ GERUND_EX = {
     "condurre":"conducendo","tradurre":"traducendo","produrre":"producendo","introdurre":"introducendo",
     "bere":"bevendo"
 }
-def gerundio_presente(v):
-    if v in GERUND_EX: return GERUND_EX[v]
-    if v.endswith("are"): return v[:-3] + "ando"
-    return v[:-3] + "endo"
-def participio_presente(v):
-    return v[:-3] + "ente"
-
-# Aux helpers
-def aux_present(aux): return ["ho","hai","ha","abbiamo","avete","hanno"] if aux=="avere" else ["sono","sei","è","siamo","siete","sono"]
-def aux_imperf(aux):  return ["avevo","avevi","aveva","avevamo","avevate","avevano"] if aux=="avere" else ["ero","eri","era","eravamo","eravate","erano"]
-def aux_rem(aux):     return ["ebbi","avesti","ebbe","avemmo","aveste","ebbero"] if aux=="avere" else ["fui","fosti","fu","fummo","foste","furono"]
-def aux_fut(aux):     return ["avrò","avrai","avrà","avremo","avrete","avranno"] if aux=="avere" else ["sarò","sarai","sarà","saremo","sarete","saranno"]
-def aux_cond(aux):    return ["avrei","avresti","avrebbe","avremmo","avreste","avrebbero"] if aux=="avere" else ["sarei","saresti","sarebbe","saremmo","sareste","sarebbero"]
-def aux_cong_pres(aux): return ["che io abbia","che tu abbia","che lui/lei abbia","che noi abbiamo","che voi abbiate","che loro abbiano"] if aux=="avere" else ["che io sia","che tu sia","che lui/lei sia","che noi siamo","che voi siate","che loro siano"]
-def aux_cong_impf(aux):  return ["che io avessi","che tu avessi","che lui/lei avesse","che noi avessimo","che voi aveste","che loro avessero"] if aux=="avere" else ["che io fossi","che tu fossi","che lui/lei fosse","che noi fossimo","che voi foste","che loro fossero"]
-
-def compose(aux_forms, pp, essere=False):
-    out = []
-    for p,a in zip(IT_PRONOUNS, aux_forms):
-        if essere:
-            # plural agreement -> -i (masc. default)
-            plural = any(k in a for k in ["siamo","siete","eravamo","eravate","saremo","sarete","fummo","foste"]) or a.endswith(("mo","te","no"))
-            adj = (pp[:-1] + "i") if (plural and pp.endswith("o")) else pp
-            out.append(f"{p} {a} {adj}")
-        else:
-            out.append(f"{p} {a} {pp}")
-    return out
-
-def congiuntivo_presente_full(v):
-    return [f"che {p} {f}" for p,f in zip(IT_PRONOUNS, cong_pres(v))]
-
-def congiuntivo_imperfetto_full(v):
-    return congiuntivo_imperfetto(v)
-
-def build_json(v):
-    aux = AUX[v]
-    essere = (aux == "essere")
-    pp = PP[v]
-    fr_disp, fr_ascii = FR_MAP[v]
-
-    data = {
-        "source_lang": "fr",
-        "target_lang": "it",
-        "source_lemma": fr_disp,
-        "target_lemma": v,
-        "meta": {
-            "regularity": { "fr": "irrégulier", "it": "verbo irregolare" },
-            "auxiliary": { "fr": "être" if essere else "avoir", "it": aux }
-        },
-        "pronouns": { "fr": FR_PRONOUNS, "it": IT_PRONOUNS },
-        "Indicativo": {
-            "Presente": with_pronouns(PRES_IND[v]),
-            "Passato prossimo": compose(aux_present(aux), pp, essere=essere),
-            "Imperfetto": imperfetto(v),
-            "Trapassato prossimo": compose(aux_imperf(aux), pp, essere=essere),
-            "Passato remoto": passato_remoto(v),
-            "Trapassato remoto": compose(aux_rem(aux), pp, essere=essere),
-            "Futuro semplice": futuro_semplice(v),
-            "Futuro anteriore": compose(aux_fut(aux), pp, essere=essere),
-        },
-        "Condizionale": {
-            "Presente": condizionale_presente(v),
-            "Passato": compose(aux_cond(aux), pp, essere=essere),
-        },
-        "Congiuntivo": {
-            "Presente": congiuntivo_presente_full(v),
-            "Passato": [f"{a} {pp}" for a in aux_cong_pres(aux)],
-            "Imperfetto": congiuntivo_imperfetto_full(v),
-            "Trapassato": [f"{a} {pp}" for a in aux_cong_impf(aux)],
-        },
-        "Imperativo": { "Presente": imperativo(v) },
-        "Infinito": {
-            "Presente": [v],
-            "Passato": [("essere" if essere else "avere") + " " + pp]
-        },
-        "Participio": {
-            "Presente": [participio_presente(v)],
-            "Passato": [pp]
-        },
-        "Gerundio": {
-            "Presente": [gerundio_presente(v)],
-            "Passato": [("essendo" if essere else "avendo") + " " + pp]
-        }
-    }
-
-    path = os.path.join(DECK_DIR, f"{fr_ascii}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return os.path.basename(path)
-
-# --- write files ---
-new_files = [build_json(v) for v in VERBS]
 
-# --- merge into decks/fr-it/index.json ---
-index_path = os.path.join(DECK_DIR, "index.json")
-try:
-    with open(index_path, "r", encoding="utf-8") as f:
-        idx = json.load(f)
-    files = list(dict.fromkeys((idx.get("files") or []) + new_files))
-except FileNotFoundError:
-    files = new_files
+def verbs():
+    return [Verb(v, *FR_MAP[v], AUX[v], "irregular", pp=PP[v], fut_stem=FUT_STEM[v], remoto=REMOTO.get(v),
+                 presente=PRES_IND[v], imperfetto=IMPERFETTO.get(v), impf_stem=IMPF_STEM.get(v),
+                 cong_pres=CONG_PRES.get(v), cong_impf_stem=CONG_IMPF_STEM.get(v),
+                 imperativo=IMPERATIVO.get(v), gerundio=GERUND_EX.get(v))
+            for v in VERBS]
 
-with open(index_path, "w", encoding="utf-8") as f:
-    json.dump({"files": files}, f, ensure_ascii=False, indent=2)
+if __name__ == "__main__":
+    # --- write changed files, merge into index.json, then manifest + per-tense shards ---
+    with profiling(profile_path(sys.argv[1:], __file__)):
+        report = generate(verbs(), DECK_DIR, force="--force" in sys.argv[1:],
+                          defer_index="--defer-index" in sys.argv[1:])
 
-print(f"Generated {len(new_files)} irregulars and updated index.json.")
+    print(f"{len(report['files'])} irregulars: {report['generated']} generated, {report['skipped']} skipped "
+          f"(unchanged spec), {report['written']} written.")
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Generate FR->IT JSON files (ALL TENSES) from a verb list instead of the dicts
+of the Create*.py scripts, e.g. a frequency list of several thousand verbs.
+
+The list is a CSV (or TSV, by extension) with a header row named after the
+Verb fields of conjugation.py; only infinitive, source_lemma, aux and pp are
+required:
+
+  infinitive  source_lemma  file     aux     group      pp        fut_stem  remoto                         isc ...
+  scrivere    écrire                 avere              scritto             scrissi|scrivesti|scrisse|...
+  finire      finir                  avere              finito                                             1
+
+  file       defaults to the ASCII French lemma (écrire -> ecrire)
+  group      defaults to the infinitive ending ("are" / "ere" / "ire"); "irregular" needs presente
+  isc        1/yes/true for -isc- verbs
+  lists      (remoto, presente, imperfetto, cong_pres, imperativo) are 6 forms separated by |
+
+The whole list is read once first, so that a bad row stops the run before
+any file is written; the rows are then streamed again and conjugated by a
+process pool (--workers, default one per CPU) that writes the verb files
+itself; index.json, the manifest and the
+shards are updated once at the end. Like the other scripts the build is
+incremental (--force regenerates every verb) and --defer-index leaves the
+index to `python deckbuild.py`. --profile [PATH] conjugates in this process
+and reports time and memory per build phase and per tense (buildprofile.py).
+
+  python CreateVerbsFromList.py verbs.tsv
+  python CreateVerbsFromList.py verbs.tsv --workers 4 --deck decks/fr-it
+  python CreateVerbsFromList.py verbs.tsv --force --profile run1.json
+  python CreateVerbsFromList.py --export verbs.tsv     # the verbs of the three Create*.py scripts
+"""
+
+import argparse, csv, os, sys, time, unicodedata
+
+from buildprofile import profiling
+from conjugation import AUX, GROUPS, REMOTO_BY_ENDING, Verb
+from deckbuild import generate
+
+DECK_DIR = os.path.join("decks", "fr-it")
+LISTS = ("remoto", "presente", "imperfetto", "cong_pres", "imperativo")
+REQUIRED = ("infinitive", "source_lemma", "aux", "pp")
+
+def ascii_name(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))\
+            .replace("’","").replace("'","").replace(" ", "_").lower()
+
+def dialect(path):
+    return "excel-tab" if path.lower().endswith((".tsv", ".tab")) else "excel"
+
+def parse_row(row):
+    """
+    One list row -> Verb; raises ValueError on a missing required column, an
+    unknown group or auxiliary, or a list the rules cannot derive.
+    """
+    row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+    missing = [k for k in REQUIRED if not row.get(k)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    inf = row["infinitive"]
+    group = row.get("group") or inf[-3:]
+    if group not in GROUPS:
+        raise ValueError(f"no group for {inf!r} (-are, -ere, -ire or irregular)")
+    if row["aux"] not in AUX:
+        raise ValueError(f"aux of {inf!r} is {row['aux']!r}, expected {' or '.join(AUX)}")
+    if group == "irregular" and not row.get("presente"):
+        raise ValueError(f"irregular verb {inf!r} needs presente")
+    if group == "irregular" and inf[-3:] not in REMOTO_BY_ENDING and not row.get("remoto"):
+        raise ValueError(f"irregular verb {inf!r} needs remoto (no -are, -ere or -ire ending)")
+    kw = {k: row.get(k) or None for k in Verb.__slots__ if k not in REQUIRED + ("file", "group", "isc")}
+    for k in LISTS:
+        if kw[k]:
+            kw[k] = [f.strip() for f in kw[k].split("|")]
+            if len(kw[k]) != 6:
+                raise ValueError(f"{k} of {inf!r} has {len(kw[k])} forms, expected 6")
+    return Verb(inf, row["source_lemma"], row.get("file") or ascii_name(row["source_lemma"]), row["aux"], group,
+                row["pp"], isc=row.get("isc", "").lower() in ("1", "yes", "true", "x"), **kw)
+
+def read_specs(path):
+    """Stream the Verbs of a CSV/TSV verb list, one row at a time."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for line, row in enumerate(csv.DictReader(f, dialect=dialect(path)), start=2):
+            try:
+                yield parse_row(row)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line}: {e}") from None
+
+def write_specs(verbs, path):
+    """Write Verbs as a verb list that read_specs() reads back unchanged."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, dialect=dialect(path))
+        w.writerow(Verb.__slots__)
+        for v in verbs:
+            w.writerow(["|".join(x) if k in LISTS and x else ("1" if x is True else x or "")
+                        for k, x in ((k, getattr(v, k)) for k in Verb.__slots__)])
+
+def script_verbs():
+    import Create2ndGroupVerbs, Create3rdGroupVerbs, CreateIrregularVerbs
+    return Create2ndGroupVerbs.verbs() + Create3rdGroupVerbs.verbs() + CreateIrregularVerbs.verbs()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate verb files from a CSV/TSV verb list.")
+    ap.add_argument("list", nargs="?", help="CSV or TSV verb list")
+    ap.add_argument("--deck", default=DECK_DIR)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--force", action="store_true", help="regenerate every verb")
+    ap.add_argument("--defer-index", action="store_true",
+                    help="queue the files in index.pending for `python deckbuild.py` instead of merging them")
+    ap.add_argument("--export", metavar="PATH", help="write the verbs of the Create*.py scripts as a list and exit")
+    ap.add_argument("--profile", nargs="?", const="CreateVerbsFromList.profile.json", metavar="PATH",
+                    help="time and memory per build phase and per tense, written to PATH (see buildprofile.py)")
+    args = ap.parse_args(argv)
+
+    if args.export:
+        write_specs(script_verbs(), args.export)
+        print(f"Wrote {args.export}.")
+        return
+    if not args.list:
+        ap.error("a verb list is required")
+
+    t0 = time.perf_counter()
+    for _ in read_specs(args.list):   # a ValueError here leaves the deck untouched
+        pass
+    with profiling(args.profile):   # conjugates in this process
+        report = generate(read_specs(args.list), args.deck, force=args.force, workers=args.workers,
+                          defer_index=args.defer_index)
+    wall = time.perf_counter() - t0
+    workers = 1 if args.profile else args.workers
+    n = len(report["files"])
+    print(f"{n} verbs: {report['generated']} generated, {report['skipped']} skipped "
+          f"(unchanged spec), {report['written']} written in {wall:.2f} s ({n / wall:.0f} verbs/s, "
+          f"{workers} worker{'s' if workers > 1 else ''}).")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        sys.exit(str(e))
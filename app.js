@@ -104,7 +104,8 @@ function infinitiveLabel(lang) {
 }
 function getExpectedInfinitive(verbObj) {
   // Prefer the JSON “Infinito/Infinitif → Presente/Présent”, fallback to target_lemma
-  return (verbObj.Infinito?.Presente?.[0])
+  return verbObj.infinitive                      // cards from /api/quiz
+      || (verbObj.Infinito?.Presente?.[0])
       || (verbObj.Infinitif?.["Présent"]?.[0])
       || verbObj.target_lemma
       || "";
@@ -118,13 +119,20 @@ function shuffleInPlace(a) {
 
 
 /* ---------- Data loading ---------- */
-async function loadDeck(direction) {
-  state.direction = direction;
-  el.deckInfo.textContent = `Deck: ${direction}`;
-  el.tense.innerHTML = `<option value="" disabled selected>Loading tenses…</option>`;
+async function loadBundle(direction) {
+  const url = `${DECK_BASE}/${direction}/bundle.json`;
+  try {
+    const r = await fetch(url, { cache: "no-cache" }); // revalidates: 304 when unchanged
+    if (!r.ok) return null;
+    const data = await r.json();
+    return { files: data.files || [], verbs: data.verbs || [] };
+  } catch (e) {
+    return null;
+  }
+}
 
+async function loadFiles(direction) {
   // Load index.json
-
   const idxUrl = `${DECK_BASE}/${direction}/index.json`;
   let files;
   try {
@@ -135,9 +143,8 @@ async function loadDeck(direction) {
   } catch (e) {
     console.error("Failed to load deck index:", e);
     el.tense.innerHTML = `<option value="" disabled selected>Cannot load ${idxUrl}</option>`;
-    return;
+    return null;
   }
-  state.deckFiles = files;
 
   // Load each verb JSON
   const verbs = [];
@@ -153,11 +160,47 @@ async function loadDeck(direction) {
       alert(`Problem with ${url}\n→ ${e.message}`);
     }
   }
-  state.verbs = verbs;
+  return { files, verbs };
+}
+
+async function loadVerbs(direction) {
+  // One request for the whole deck when served by serve.py (bundle.json);
+  // plain static hosting falls back to index.json + one file per verb.
+  const loaded = await loadBundle(direction) || await loadFiles(direction);
+  if (!loaded) return false;
+  state.deckFiles = loaded.files;
+  state.verbs = loaded.verbs;
+  return true;
+}
+
+async function loadRemoteTenses(direction) {
+  // serve.py lists the tenses of a deck itself (/api/tenses), so the verbs
+  // do not have to be downloaded just to fill the tense picker
+  try {
+    const r = await fetch(`api/tenses?direction=${encodeURIComponent(direction)}`, { cache: "no-store" });
+    if (!r.ok) return null;
+    const data = await r.json();
+    return Object.keys(data.tenses || {});
+  } catch (e) {
+    return null;
+  }
+}
+
+async function loadManifest(direction) {
+  // manifest.json (written by the generators): Mood|Tense -> files with all 6 forms
+  try {
+    const r = await fetch(`${DECK_BASE}/${direction}/manifest.json`, { cache: "no-cache" });
+    if (!r.ok) return null;
+    return await r.json();
+  } catch (e) {
+    return null;
+  }
+}
 
+function tensesOf(verbs) {
   // Build available tenses (Mood|Tense) where there are exactly 6 forms
   const tensesSet = new Set();
-  for (const v of state.verbs) {
+  for (const v of verbs) {
     for (const mood of Object.keys(v)) {
       if (["source_lang","target_lang","source_lemma","target_lemma","meta","pronouns"].includes(mood)) continue;
       const moodObj = v[mood];
@@ -170,7 +213,27 @@ async function loadDeck(direction) {
       }
     }
   }
-  state.availableTenses = Array.from(tensesSet);
+  return Array.from(tensesSet);
+}
+
+async function loadDeck(direction) {
+  state.direction = direction;
+  el.deckInfo.textContent = `Deck: ${direction}`;
+  el.tense.innerHTML = `<option value="" disabled selected>Loading tenses…</option>`;
+
+  state.deckFiles = [];
+  state.verbs = [];
+  const remoteTenses = await loadRemoteTenses(direction);
+  state.remote = !!remoteTenses;   // games are then sampled by /api/quiz
+  state.manifest = state.remote ? null : await loadManifest(direction);
+  if (state.remote) {
+    state.availableTenses = remoteTenses;
+  } else if (state.manifest) {
+    state.availableTenses = Object.keys(state.manifest.tenses || {});
+  } else {
+    if (!await loadVerbs(direction)) return;
+    state.availableTenses = tensesOf(state.verbs);
+  }
 
   // Populate tense select
   if (state.availableTenses.length === 0) {
@@ -204,7 +267,63 @@ async function loadDeck(direction) {
 }
 
 /* ---------- Game build ---------- */
-function buildQueue() {
+async function fetchQuiz() {
+  // Only the sampled verbs, each with just the selected tense (serve.py /api/quiz);
+  // with a student id, the ones due for review first (/api/next)
+  const params = new URLSearchParams({ direction: state.direction, n: String(state.gameCount) });
+  const student = studentId();
+  if (student) params.set("student", student);
+  if (state.selectedTense && !(student && state.infOnly)) params.set("tense", state.selectedTense); // infinitive-only games have their own queue
+  try {
+    const r = await fetch(`api/${student ? "next" : "quiz"}?${params}`, { cache: "no-store" });
+    if (!r.ok) return null;
+    return (await r.json()).verbs || [];
+  } catch (e) {
+    return null;
+  }
+}
+
+function cardsFromShard(shard, k) {
+  // Shard entries -> verb-shaped cards holding the one tense (see deckbuild.py)
+  return sample(shard.verbs || [], k).map(e => ({
+    source_lang: shard.source_lang,
+    target_lang: shard.target_lang,
+    source_lemma: e.source_lemma,
+    target_lemma: e.target_lemma,
+    pronouns: e.pronouns || shard.pronouns,
+    infinitive: e.infinitive || e.target_lemma,
+    [shard.mood]: { [shard.tense]: e.forms },
+  }));
+}
+
+async function sampleFromManifest() {
+  // One tense shard when the manifest has it: a single small download
+  const shardPath = state.selectedTense && state.manifest.tenses?.[state.selectedTense]?.shard;
+  if (shardPath) {
+    try {
+      const r = await fetch(`${DECK_BASE}/${state.direction}/${shardPath}`, { cache: "no-cache" });
+      if (r.ok) return cardsFromShard(await r.json(), state.gameCount);
+    } catch (e) {
+      console.error("Failed to load tense shard:", shardPath, e);
+    }
+  }
+  // Otherwise pick the files from the manifest, then fetch only those verbs
+  const names = state.selectedTense
+    ? (state.manifest.tenses?.[state.selectedTense]?.files || [])
+    : (state.manifest.files || []);
+  const picked = sample(names, Math.min(state.gameCount, names.length));
+  const verbs = await Promise.all(picked.map(async f => {
+    try {
+      const r = await fetch(`${DECK_BASE}/${state.direction}/${f}`, { cache: "no-cache" });
+      return r.ok ? await r.json() : null;
+    } catch (e) {
+      return null;
+    }
+  }));
+  return verbs.filter(Boolean);
+}
+
+function sampleLocal() {
   let pool;
   if (state.infOnly) {
     pool = state.verbs.slice(); // any verb is fine in infinitive-only mode
@@ -212,7 +331,6 @@ function buildQueue() {
     const [mood, tense] = state.selectedTense.split("|");
     pool = state.verbs.filter(v => v[mood] && Array.isArray(v[mood][tense]) && v[mood][tense].length === 6);
   }
-  if (!pool.length) { alert("No verbs available for this selection."); return false; }
 
   // simple shuffle + take K
   const a = pool.slice();
@@ -221,7 +339,19 @@ function buildQueue() {
     [a[i], a[j]] = [a[j], a[i]];
   }
   const k = Math.min(state.gameCount, a.length);
-  state.queue = a.slice(0, k);
+  return a.slice(0, k);
+}
+
+async function buildQueue() {
+  let queue = state.remote ? await fetchQuiz() : null;
+  if (!queue && state.manifest) queue = await sampleFromManifest();
+  if (!queue) {
+    // no server-side sampling: pick from the whole deck
+    if (!state.verbs.length && !await loadVerbs(state.direction)) return false;
+    queue = sampleLocal();
+  }
+  if (!queue.length) { alert("No verbs available for this selection."); return false; }
+  state.queue = queue;
 
   state.index = 0;
   state.answersAll = [];
@@ -243,7 +373,7 @@ function renderCard() {
 
   const tgtLang = v.target_lang;
   const pronouns = v.pronouns?.[tgtLang] || [];
-  const forms = v[mood][tense];
+  const forms = v[mood]?.[tense] || [];
 
   state.current = { verb: v, forms, pronouns, answers: Array(6).fill("") };
 
@@ -346,13 +476,7 @@ function gradeCurrent() {
 
       // Accept with or without pronoun ("io amo" or "amo")
       const wantNorm = normalize(wantFull);
-      const wantBare = (function bareForm(expectedFull, p){
-        let s = (expectedFull || "").toLowerCase().trim();
-        if (s.startsWith("che ")) s = s.slice(4).trim();      // drop "che " (subj.)
-        const pr = (p || "").toLowerCase().trim();
-        if (pr && s.startsWith(pr + " ")) s = s.slice(pr.length + 1).trim();
-        return s;
-      })(wantFull, pronoun);
+      const wantBare = normalize(bareForm(wantFull, pronoun));
       const gotNorm  = normalize(got);
 
       const ok = (gotNorm === wantNorm) || (gotNorm === wantBare);
@@ -381,6 +505,48 @@ function gradeCurrent() {
 }
 
 
+function studentId() {
+  // Anonymous id kept by the browser: serve.py records results per student
+  try {
+    let id = localStorage.getItem("studentId");
+    if (!id) {
+      id = crypto.randomUUID ? crypto.randomUUID() : Math.random().toString(36).slice(2);
+      localStorage.setItem("studentId", id);
+    }
+    return id;
+  } catch (e) {
+    return null;   // storage disabled: graded but not recorded
+  }
+}
+
+async function gradeOnServer() {
+  // serve.py grades the whole game in one request (POST /api/grade) and its
+  // results replace the local ones; they stay when a card has no file
+  if (!state.remote || !state.queue.every(v => v.file)) return;
+  const body = {
+    direction: state.direction,
+    student: studentId(),
+    tense: state.infOnly ? null : state.selectedTense,
+    cards: state.queue.map((v, c) => ({ file: v.file, answers: state.answersAll[c] || [] })),
+  };
+  try {
+    const r = await fetch("api/grade", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+    if (!r.ok) return;
+    const graded = await r.json();
+    graded.cards.forEach((card, c) => {
+      const res = state.results[c];
+      card.ok.forEach((ok, i) => { if (res.rows[i]) res.rows[i].ok = ok; });
+      res.correct = card.correct;
+    });
+  } catch (e) {
+    console.error("Server grading failed:", e);
+  }
+}
+
 function renderResults() {
   const totalRight = state.results.reduce((acc, r) => acc + r.correct, 0);
   const totalAsked = state.results.reduce((acc, r) => acc + r.total, 0);
@@ -440,7 +606,7 @@ el.count.addEventListener("change", () => {
 el.checkBtn.addEventListener("click", () => {
   gradeCurrent();
 });
-el.startBtn.addEventListener("click", () => {
+el.startBtn.addEventListener("click", async () => {
   state.infOnly = !!el.infOnly?.checked;           // NEW
   state.selectedTense = el.tense.value;
   state.gameCount = Number(el.count.value || DEFAULT_CARDS);
@@ -449,18 +615,20 @@ el.startBtn.addEventListener("click", () => {
     alert("Pick a tense or check ‘Infinitive only’.");
     return;
   }
-  if (!buildQueue()) return;
+  if (!await buildQueue()) return;
   showGame();
   renderCard();
   // scrollToSection(el.game); // optional
 });
 
 
-el.nextBtn.addEventListener("click", () => {
+el.nextBtn.addEventListener("click", async () => {
   state.index++;
 
   // Finished? Show results and SCROLL to them.
   if (state.index >= state.queue.length) {
+    el.nextBtn.disabled = true;
+    await gradeOnServer();
     showResults();        // hides setup & game, shows results
     renderResults();
     scrollToSection(el.results);   // <-- crucial: do NOT wrap this in keepViewport
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio entry point for the flashcards app: the static tree and every
+endpoint of serve.py, for many idle and kept-alive connections.
+
+serve.py gives each kept-alive connection a thread for as long as it stays
+open, so a class thinking over its answers holds the whole pool. Here the
+connections live on the event loop, a few KB each, and only the work runs in
+a small thread pool: the request is read with asyncio streams, answered by
+serve.Handler itself on in-memory files (Exchange: static cache, file stats
+and opens, form index lookups, SQLite), and files too big for the static
+cache are sent from the loop with loop.sendfile() (os.sendfile where it can).
+
+  python aserve.py                      # http://localhost:8000
+  python aserve.py --port 8080 --threads 8 --idle-timeout 120
+  python bench/asyncload.py             # 5,000 concurrent connections, aserve.py vs serve.py
+
+Same options as serve.py where they apply; there is no --workers or
+--backlog, as a connection costs no thread.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import os
+import re
+import signal
+
+import serve
+from serve import Handler, WEB_ROOT
+
+PORT = 8000
+THREADS = 4            # executor threads answering requests
+IDLE_TIMEOUT = 60      # seconds a kept-alive connection may sit idle: here it costs no thread
+LISTEN_BACKLOG = 1024  # connections the kernel queues before accept()
+HEAD_MAX = 64 * 1024   # bytes of request line and headers
+BODY_MAX = serve.GRADE_MAX_KB * 1024
+CHUNK = 256 * 1024     # read size of the copy loop (--no-sendfile)
+
+CONTENT_LENGTH_RE = re.compile(rb"\r\ncontent-length:[ \t]*(\d+)[ \t]*\r\n", re.I)
+CHUNKED_RE = re.compile(rb"\r\ntransfer-encoding:", re.I)
+
+
+class Exchange(Handler):
+    """
+    serve.Handler without a socket: run() feeds it one request (head and
+    body) and returns what it wrote, the response head and any in-memory
+    body. A file it would stream from disk is left open in self.stream, with
+    self.range, for the event loop to send. One Exchange per connection, so
+    the served count and Keep-Alive max carry over between its requests.
+    """
+    timeout = IDLE_TIMEOUT
+
+    def __init__(self, client_address, server):   # what BaseRequestHandler and setup() would set
+        self.client_address = client_address
+        self.server = server
+        self.directory = WEB_ROOT
+        self.served = 0
+        self.close_connection = True
+        self.stream = None
+
+    def run(self, request):
+        self.rfile, self.wfile, self.stream = io.BytesIO(request), io.BytesIO(), None
+        self.handle_one_request()
+        return self.wfile.getvalue()
+
+    def do_GET(self):
+        if self.route():
+            return
+        f = self.send_head()
+        if isinstance(f, io.BytesIO):   # cached file, listing
+            self.wfile.write(f.getvalue())
+        elif f is not None:
+            self.stream = f
+
+
+class AsyncServer:
+    def __init__(self, threads=THREADS):
+        self.executor = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix="aserve")
+        self.connections = 0
+
+    def busy(self):
+        return False   # Handler.end_headers(): no connection waits for a thread here
+
+    def metrics(self):
+        return [("serve_open_connections", "gauge", "Connections held by the event loop.", [({}, self.connections)])]
+
+    async def connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        exchange = Exchange(writer.get_extra_info("peername", ("", 0))[:2], self)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), Exchange.timeout)
+                except asyncio.LimitOverrunError:
+                    writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\n"
+                                 b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break   # closed, or idle for too long
+                m = CONTENT_LENGTH_RE.search(head)
+                length = int(m.group(1)) if m else 0
+                readable = length <= BODY_MAX and not CHUNKED_RE.search(head)
+                body = await asyncio.wait_for(reader.readexactly(length), Exchange.timeout) if readable and length else b""
+                writer.write(await loop.run_in_executor(self.executor, exchange.run, head + body))
+                if exchange.stream is not None:
+                    await self.send_file(writer, exchange)
+                await writer.drain()
+                if exchange.close_connection or not readable:   # a body left unread ends the connection
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.connections -= 1
+            if exchange.stream is not None:
+                exchange.stream.close()
+            writer.close()
+
+    async def send_file(self, writer, exchange):
+        """The file serve.Handler opened (exchange.range of it for a 206), after the head already written."""
+        loop = asyncio.get_running_loop()
+        f, (start, count) = exchange.stream, exchange.range or (0, None)
+        try:
+            await writer.drain()
+            if exchange.use_sendfile:   # falls back to reads in the default executor where it cannot
+                await loop.sendfile(writer.transport, f, start, count)
+                return
+            f.seek(start)
+            left = os.fstat(f.fileno()).st_size - start if count is None else count
+            while left > 0:
+                buf = await loop.run_in_executor(self.executor, f.read, min(left, CHUNK))
+                if not buf:
+                    break
+                writer.write(buf)
+                left -= len(buf)
+                await writer.drain()
+        finally:
+            f.close()
+            exchange.stream = None
+
+
+def raise_fd_limit():
+    """Allow as many open files as the hard limit: each connection holds one."""
+    try:
+        import resource
+    except ImportError:   # Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+async def run(args):
+    app = AsyncServer(args.threads)
+    server = await asyncio.start_server(app.connection, host=args.host or None, port=args.port,
+                                        backlog=LISTEN_BACKLOG, limit=HEAD_MAX)
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+        except (NotImplementedError, AttributeError, ValueError):   # Windows: Ctrl+C raises KeyboardInterrupt
+            pass
+    print(f"Serving at http://localhost:{args.port} (asyncio)")
+    async with server:
+        await stop.wait()
+    app.executor.shutdown(wait=True)   # requests already handed to a thread finish
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve the flashcards app with asyncio.")
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--host", default="")
+    ap.add_argument("--threads", type=int, default=THREADS, help="threads answering requests")
+    ap.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds before an idle connection is closed")
+    ap.add_argument("--max-requests", type=int, default=serve.MAX_REQUESTS, help="requests served per connection")
+    ap.add_argument("--cache-mb", type=float, default=serve.CACHE_MB, help="memory cap of the static file cache")
+    ap.add_argument("--no-sendfile", action="store_true", help="copy static files through Python buffers")
+    ap.add_argument("--results", default=serve.RESULTS_DB, metavar="PATH",
+                    help="SQLite file of per-student results (empty: do not record)")
+    ap.add_argument("--access-log", choices=("buffered", "stderr", "off"), default="buffered",
+                    help="access log to stderr, written every second (buffered) or per request")
+    args = ap.parse_args(argv)
+    serve.ACCESS_LOG.mode = args.access_log
+    Exchange.timeout = args.idle_timeout
+    Exchange.max_requests = args.max_requests
+    Handler.use_sendfile = not args.no_sendfile
+    raise_fd_limit()
+    serve.load(args)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if serve.RESULTS is not None:
+            serve.RESULTS.close()   # commit the games still queued
+        serve.ACCESS_LOG.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Requests per second of serve.py with each --access-log mode: "stderr" (a
+write per request, as before), "buffered" (the default, written every
+second) and "off". stderr goes to a file, like a redirected log. Also times
+one GET /metrics after the run.
+
+  python bench/accesslog.py
+  python bench/accesslog.py --clients 16 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port, wait_ready
+from prefork import PATH, client
+
+
+def run(mode, args):
+    port = free_port()
+    with tempfile.TemporaryFile() as log:
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "--port", str(port),
+                                   "--results", "", "--access-log", mode], stdout=subprocess.DEVNULL, stderr=log)
+        try:
+            wait_ready(port, timeout=60)
+            time.sleep(1)
+            out = multiprocessing.Queue()
+            clients = [multiprocessing.Process(target=client, args=(port, args.seconds, out))
+                       for _ in range(args.clients)]
+            for c in clients:
+                c.start()
+            results = [out.get() for _ in clients]
+            for c in clients:
+                c.join()
+            t0 = time.perf_counter()
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as r:
+                size = len(r.read())
+            scrape = time.perf_counter() - t0
+        finally:
+            server.terminate()
+            server.wait()
+    done = sum(d for d, _ in results)
+    print(f"--access-log {mode:<9} {done / args.seconds:8.0f} requests/s   GET /metrics {scrape * 1e3:5.1f} ms, {size} bytes")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+    print(f"{args.clients} keep-alive clients on GET {PATH}, stderr to a file")
+    for mode in ("stderr", "buffered", "off"):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
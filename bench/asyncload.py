@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Many concurrent, mostly idle keep-alive connections, like a school of
+students thinking over their answers: --connections clients (asyncio, in one
+process) each open a connection, then ask for a card every --think seconds on
+average for --seconds, reconnecting when the server closes. Run against
+aserve.py and against serve.py (a thread per kept-alive connection).
+
+  python bench/asyncload.py
+  python bench/asyncload.py --connections 2000 --think 5 --seconds 20 --servers aserve
+
+Prints requests answered, errors (refused, reset, 503), reconnects, latency
+p50 / p99, and the server's CPU time and peak RSS from /proc (Linux).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port, wait_ready
+from sendfile import cpu_seconds
+
+PATH = "/api/quiz?direction=fr-it&n=1"
+SERVERS = {"aserve": "aserve.py", "serve": "serve.py"}
+
+
+def peak_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def get(reader, writer):
+    """One GET on an open connection: (status, keep the connection)."""
+    writer.write(f"GET {PATH} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length, close = 0, False
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"connection":
+            close = value.strip().lower() == b"close"
+    await reader.readexactly(length)
+    return status, not close
+
+
+async def student(port, end, stats):
+    conn = None
+    await asyncio.sleep(random.uniform(0, stats["think"]))   # spread the first requests
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        try:
+            if conn is None:
+                conn = await asyncio.open_connection("127.0.0.1", port)
+                stats["connects"] += 1
+            status, keep = await asyncio.wait_for(get(*conn), 30)
+            stats["latency"].append(time.perf_counter() - t0)
+            if status == 200:
+                stats["ok"] += 1
+            else:
+                stats["errors"][status] = stats["errors"].get(status, 0) + 1
+            if not keep:
+                conn[1].close()
+                conn = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+            stats["errors"][type(e).__name__] = stats["errors"].get(type(e).__name__, 0) + 1
+            if conn is not None:
+                conn[1].close()
+            conn = None
+            await asyncio.sleep(1)
+        await asyncio.sleep(min(random.expovariate(1 / stats["think"]), max(0, end - time.perf_counter())))
+    if conn is not None:
+        conn[1].close()
+
+
+async def load(port, args):
+    stats = {"ok": 0, "errors": {}, "connects": 0, "latency": [], "think": args.think}
+    end = time.perf_counter() + args.seconds
+    await asyncio.gather(*[student(port, end, stats) for _ in range(args.connections)])
+    return stats
+
+
+def run(name, args):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, SERVERS[name]), "--port", str(port), "--results", ""],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, timeout=60)
+        time.sleep(2)   # the form index and BK-trees are built in the background
+        cpu0 = cpu_seconds(server.pid)
+        stats = asyncio.run(load(port, args))
+        cpu, rss = cpu_seconds(server.pid) - cpu0, peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    lat = sorted(stats["latency"]) or [0.0]
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    errors = ", ".join(f"{k} {v}" for k, v in sorted(stats["errors"].items(), key=str)) or "none"
+    print(f"{SERVERS[name]:<10} {stats['ok'] / args.seconds:7.0f} ok/s  p50 {statistics.median(lat) * 1e3:7.1f} ms  "
+          f"p99 {p99 * 1e3:7.1f} ms  connects {stats['connects']:6}  CPU {cpu:5.1f} s  peak RSS {rss:5.0f} MB  "
+          f"errors: {errors}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--connections", type=int, default=5000)
+    ap.add_argument("--think", type=float, default=10, help="mean seconds between a client's requests")
+    ap.add_argument("--seconds", type=float, default=30)
+    ap.add_argument("--servers", nargs="+", default=list(SERVERS), choices=SERVERS)
+    args = ap.parse_args()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))   # one socket per client
+    if args.connections + 100 > hard:
+        sys.exit(f"open file limit {hard} is below --connections")
+    print(f"{args.connections} keep-alive clients, one GET {PATH} every {args.think:g} s on average, "
+          f"for {args.seconds:g} s")
+    for name in args.servers:
+        run(name, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of CreateVerbsFromList.py on a synthetic verb list: the verbs of the
+three Create*.py scripts repeated under new file names up to --verbs rows,
+generated into a temporary deck serially, with a process pool, then rebuilt
+with no change (incremental: nothing is conjugated or written).
+
+  python bench/bulkgen.py                  # 10000 verbs, 1 worker vs one per CPU
+  python bench/bulkgen.py --verbs 2000 --workers 4
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CreateVerbsFromList import read_specs, script_verbs, write_specs
+from conjugation import Verb
+from deckbuild import generate
+
+
+def synthetic(n):
+    base = script_verbs()
+    for i in range(n):
+        v = Verb(*(getattr(base[i % len(base)], k) for k in Verb.__slots__))
+        v.file = f"{v.file}_{i}"
+        yield v
+
+
+def timed(name, path, deck, workers, force=False):
+    t0 = time.perf_counter()
+    report = generate(read_specs(path), deck, force=force, workers=workers)
+    wall = time.perf_counter() - t0
+    n = len(report["files"])
+    print(f"{name:<22} {workers:>2} worker(s)  {wall:7.2f} s  {n / wall:8.0f} verbs/s  "
+          f"generated {report['generated']:>6}  skipped {report['skipped']:>6}  written {report['written']:>6}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--verbs", type=int, default=10000)
+    ap.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bulkgen-")
+    try:
+        path = os.path.join(tmp, "verbs.tsv")
+        write_specs(synthetic(args.verbs), path)
+        print(f"{args.verbs} verbs, list {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+        timed("serial, empty deck", path, os.path.join(tmp, "serial"), 1)
+        timed("pool, empty deck", path, os.path.join(tmp, "pool"), args.workers)
+        timed("pool, --force", path, os.path.join(tmp, "pool"), args.workers, force=True)
+        timed("pool, no change", path, os.path.join(tmp, "pool"), args.workers)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Build time, memory and query latency of the form index behind /api/complete
+and /api/lookup (lexicon.FormIndex, a packed sorted array) on synthetic decks
+of 100 and 10,000 distinct verbs (see bench/deckmem.py), plus decks/fr-it.
+Memory is what the built index keeps: the key blob, the offset and hit arrays
+and the shared-hit tuples.
+
+  python bench/complete.py
+  python bench/complete.py --verbs 100 1000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from deckmem import synthetic
+from deckstore import DeckStore
+from lexicon import FormIndex
+
+
+def bench(name, root, direction):
+    deck = DeckStore(root).get(direction)
+    t0 = time.perf_counter()
+    index = FormIndex(deck)
+    built = time.perf_counter() - t0
+    size = sum(sys.getsizeof(x) for x in (index.blob, index.starts, index.forms, index.lemmas, index.multi))
+    size += sum(sys.getsizeof(t) for t in index.multi)
+
+    rng = random.Random(1)
+    keys = [index.key(j) for j in rng.sample(range(len(index)), min(2000, len(index)))]
+    prefixes = [k[:rng.randint(1, 6)] for k in keys]
+
+    def latency(fn, args):
+        lat = []
+        for a in args:
+            t0 = time.perf_counter()
+            fn(a)
+            lat.append(time.perf_counter() - t0)
+        lat.sort()
+        return lat[len(lat) // 2] * 1e6, lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1e6
+
+    c50, c99 = latency(lambda p: index.complete(p, 10), prefixes)
+    l50, l99 = latency(index.lookup, keys)
+    print(f"{name:<12} {len(deck):>6} verbs {len(index):>8} keys  build {built:6.2f} s  "
+          f"index {size / 2**20:6.1f} MB ({size / len(index):3.0f} B/key)  "
+          f"complete(limit=10) p50 {c50:5.0f} us p99 {c99:5.0f} us  lookup p50 {l50:4.0f} us p99 {l99:4.0f} us")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--verbs", type=int, nargs="+", default=[100, 10000])
+    args = ap.parse_args()
+
+    bench("decks/fr-it", os.path.join(ROOT, "decks"), "fr-it")
+    for n in args.verbs:
+        tmp = tempfile.mkdtemp(prefix="complete-")
+        try:
+            synthetic(os.path.join(tmp, "synthetic"), n)
+            bench("synthetic", tmp, "synthetic")
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
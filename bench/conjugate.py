@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the conjugation engine: full verb documents (build_json, all
+tenses) and single tenses (conjugate) per second, over the verbs of the three
+generator scripts.
+
+  python bench/conjugate.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Create2ndGroupVerbs, Create3rdGroupVerbs, CreateIrregularVerbs
+from conjugation import build_json, compound, compound_che, conjugate
+
+
+def rate(fn, verbs, seconds=1.0):
+    n, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        for v in verbs:
+            fn(v)
+        n += len(verbs)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    verbs = Create2ndGroupVerbs.verbs() + Create3rdGroupVerbs.verbs() + CreateIrregularVerbs.verbs()
+    print(f"{len(verbs)} verbs")
+    compound.cache_clear(); compound_che.cache_clear()
+    t0 = time.perf_counter()
+    for v in verbs:
+        build_json(v)
+    print(f"first pass (cold aux cache)   {len(verbs) / (time.perf_counter() - t0):10.0f} verbs/s")
+    print(f"build_json, all tenses         {rate(build_json, verbs):10.0f} verbs/s")
+    print(f"conjugate Indicativo|Presente  {rate(lambda v: conjugate(v, 'Indicativo', 'Presente'), verbs):10.0f} verbs/s")
+    print(f"conjugate Passato prossimo     {rate(lambda v: conjugate(v, 'Indicativo', 'Passato prossimo'), verbs):10.0f} verbs/s")
+    info = compound.cache_info()
+    print(f"compound tense cache: {info.hits} hits, {info.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Memory of a deck held by deckstore.Deck (VerbRecords, interned strings, shared
+shapes) against the plain json.load documents, per 1000 verbs. Measured on
+decks/fr-it and on a synthetic deck of --verbs distinct verbs (the verbs of the
+Create*.py scripts with prefixed infinitives and participles, so no two verbs
+share forms). Each measure runs in a fresh process: Python heap from
+tracemalloc, resident memory from /proc/self/statm where available.
+
+  python bench/deckmem.py
+  python bench/deckmem.py --verbs 5000
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def child(mode, deck_dir):
+    """Load the deck one way and print {"verbs", "heap", "rss"} as JSON."""
+    from deckstore import Deck, deck_signature, iter_verbs, read_verbs
+    files, sig = deck_signature(deck_dir)
+    gc.collect()
+    r0 = rss()
+    tracemalloc.start()
+    if mode == "store":
+        verbs = Deck("bench", sig, files, iter_verbs(deck_dir, files))
+    else:
+        verbs = read_verbs(deck_dir, files)
+    gc.collect()
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(json.dumps({"verbs": len(verbs.verbs if mode == "store" else verbs), "heap": heap, "rss": rss() - r0}))
+
+
+def synthetic(deck_dir, n):
+    from conjugation import Verb
+    from CreateVerbsFromList import script_verbs
+    from deckbuild import generate
+    base = script_verbs()
+    def verbs():
+        for i in range(n):
+            v = Verb(*(getattr(base[i % len(base)], k) for k in Verb.__slots__))
+            tag = f"x{i}"
+            v.infinitive, v.pp, v.file = tag + v.infinitive, tag + v.pp, f"{v.file}_{i}"
+            for k in ("fut_stem", "impf_stem", "cong_impf_stem", "gerundio"):
+                if getattr(v, k):
+                    setattr(v, k, tag + getattr(v, k))
+            for k in ("remoto", "presente", "imperfetto", "cong_pres"):
+                if getattr(v, k):
+                    setattr(v, k, [tag + f for f in getattr(v, k)])
+            yield v
+    generate(verbs(), deck_dir)
+
+
+def measure(name, deck_dir):
+    res = {}
+    for mode in ("json", "store"):
+        out = subprocess.run([sys.executable, __file__, "--child", mode, deck_dir],
+                             capture_output=True, text=True, check=True).stdout
+        res[mode] = json.loads(out)
+    n = res["json"]["verbs"]
+    per = lambda mode, k: res[mode][k] / n * 1000 / 2**20
+    print(f"{name:<18} {n:>6} verbs   per 1000 verbs: json.load heap {per('json', 'heap'):6.2f} MB, "
+          f"rss {per('json', 'rss'):6.2f} MB | Deck heap {per('store', 'heap'):6.2f} MB, rss {per('store', 'rss'):6.2f} MB"
+          f"  ({res['json']['heap'] / res['store']['heap']:.1f}x less heap)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--verbs", type=int, default=2000)
+    ap.add_argument("--child", nargs=2, metavar=("MODE", "DECK"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    measure("decks/fr-it", os.path.join(ROOT, "decks", "fr-it"))
+    tmp = tempfile.mkdtemp(prefix="deckmem-")
+    try:
+        synthetic(tmp, args.verbs)
+        measure("synthetic", tmp)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
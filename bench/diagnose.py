@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Build time and query latency of the BK-trees behind /api/diagnose
+(lexicon.FormIndex.near) on decks/fr-it and synthetic decks of 100 and 10,000
+distinct verbs (see bench/deckmem.py). Queries are real bare forms with one or
+two random edits; "compared" is the share of the indexed words whose distance
+to the query was computed, against a linear scan of all of them.
+
+  python bench/diagnose.py
+  python bench/diagnose.py --verbs 1000 --k 1 2 3
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from deckmem import synthetic
+from deckstore import DeckStore
+from lexicon import FormIndex, measure
+
+LETTERS = "abcdefghilmnopqrstuvz"
+
+
+def typo(rng, word, edits):
+    for _ in range(edits):
+        i = rng.randrange(len(word) + 1)
+        op = rng.randrange(3)
+        if op == 0 or not word:
+            word = word[:i] + rng.choice(LETTERS) + word[i:]
+        elif op == 1:
+            i = min(i, len(word) - 1)
+            word = word[:i] + word[i + 1:]
+        else:
+            i = min(i, len(word) - 1)
+            word = word[:i] + rng.choice(LETTERS) + word[i + 1:]
+    return word
+
+
+def compared(trees, query, k):
+    """Nodes near() visits, i.e. distances it computes."""
+    n, dist = 0, measure(query)
+    for tree in (trees[m] for m in range(len(query) - k, len(query) + k + 1) if m in trees):
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            n += 1
+            d = dist(tree.word(tree.ids[node]))
+            kids = tree.children[node]
+            if kids:
+                stack.extend(c for dd, c in kids.items() if d - k <= dd <= d + k)
+    return n
+
+
+def bench(name, root, direction, ks, queries):
+    deck = DeckStore(root).get(direction)
+    index = FormIndex(deck)
+    t0 = time.perf_counter()
+    trees = index.trees()
+    built = time.perf_counter() - t0
+
+    rng = random.Random(1)
+    ids = [j for tree in trees.values() for j in tree.ids]
+    answers = [typo(rng, index.key(j), rng.randint(1, 2)) for j in rng.sample(ids, min(queries, len(ids)))]
+    print(f"{name:<12} {len(deck):>6} verbs {len(ids):>8} words  {len(trees)} trees built in {built:6.2f} s")
+    for k in ks:
+        lat, found = [], 0
+        for a in answers:
+            t0 = time.perf_counter()
+            found += bool(index.near(a, k, 10))
+            lat.append(time.perf_counter() - t0)
+        lat.sort()
+        seen = sum(compared(trees, a, k) for a in answers[:100]) / min(100, len(answers))
+        print(f"{'':<12} k={k}  p50 {lat[len(lat) // 2] * 1e3:6.2f} ms  p99 "
+              f"{lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1e3:6.2f} ms  "
+              f"compared {seen / len(ids):5.1%} of the words  answered {found / len(answers):5.1%}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--verbs", type=int, nargs="+", default=[100, 10000])
+    ap.add_argument("--k", type=int, nargs="+", default=[1, 2])
+    ap.add_argument("--queries", type=int, default=300)
+    args = ap.parse_args()
+
+    bench("decks/fr-it", os.path.join(ROOT, "decks"), "fr-it", args.k, args.queries)
+    for n in args.verbs:
+        tmp = tempfile.mkdtemp(prefix="diagnose-")
+        try:
+            synthetic(os.path.join(tmp, "synthetic"), n)
+            bench("synthetic", tmp, "synthetic", args.k, args.queries)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
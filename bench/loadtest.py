@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Local load test for serve.py: N simulated students load the page and the whole
+fr-it deck at the same time, like a classroom opening the app together.
+
+  python bench/loadtest.py                 # old single-threaded server vs serve.py
+  python bench/loadtest.py --clients 60    # bigger class
+  python bench/loadtest.py --keep-alive    # reuse one HTTP/1.1 connection per student
+
+Prints p50 / p99 / max latency per request, the wall time of the run and the
+number of TCP connections the clients had to open.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DECK = os.path.join(ROOT, "decks", "fr-it")
+
+# the server as it was before the worker pool: one request at a time
+BASELINE = ("import http.server, socketserver, sys; "
+            "socketserver.TCPServer(('127.0.0.1', int(sys.argv[1])), "
+            "http.server.SimpleHTTPRequestHandler).serve_forever()")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=10.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def deck_paths():
+    with open(os.path.join(DECK, "index.json"), encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    return ["/index.html", "/app.js", "/decks/fr-it/index.json"] + [f"/decks/fr-it/{f}" for f in files]
+
+
+def student(port, paths, latencies, errors, connects, keep_alive=False):
+    """
+    One browser loading the app. Without keep_alive every request gets its own
+    connection, like HTTP/1.0; with it the connection is reused until the
+    server closes it.
+    """
+    c = None
+    for p in paths:
+        t0 = time.perf_counter()
+        try:
+            if c is None:
+                c = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                connects.append(1)
+            c.request("GET", p)
+            r = c.getresponse()
+            r.read()
+            if r.status != 200:
+                errors.append(r.status)
+            if not keep_alive or r.will_close:
+                c.close()
+                c = None
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            c = None
+        latencies.append(time.perf_counter() - t0)
+    if c is not None:
+        c.close()
+
+
+def run(port, clients, paths, keep_alive=False):
+    latencies, errors, connects = [], [], []
+    threads = [threading.Thread(target=student, args=(port, paths, latencies, errors, connects, keep_alive))
+               for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return {"requests": len(latencies), "errors": len(errors), "connects": len(connects), "wall_s": wall,
+            "p50_ms": pct(0.50), "p99_ms": pct(0.99), "max_ms": latencies[-1] * 1000}
+
+
+def bench(name, cmd, clients, paths, keep_alive=False):
+    port = free_port()
+    proc = subprocess.Popen(cmd + [str(port)], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        res = run(port, clients, paths, keep_alive)
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f"{name:<10} {res['requests']:>6} req  {res['errors']:>4} err  "
+          f"p50 {res['p50_ms']:8.1f} ms  p99 {res['p99_ms']:8.1f} ms  "
+          f"max {res['max_ms']:8.1f} ms  wall {res['wall_s']:6.2f} s  conns {res['connects']}")
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=30)
+    ap.add_argument("--workers", type=int, default=32)
+    ap.add_argument("--keep-alive", action="store_true", help="reuse connections against serve.py")
+    args = ap.parse_args()
+
+    paths = deck_paths()
+    print(f"{args.clients} clients x {len(paths)} requests")
+    bench("before", [sys.executable, "-c", BASELINE], args.clients, paths)
+    bench("after", [sys.executable, "-c",
+                    "import sys, serve; serve.main(['--port', sys.argv[1], '--workers', '%d', '--results', ''])" % args.workers],
+          args.clients, paths, args.keep_alive)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Requests per second of serve.py with 1, 2, 4 ... worker processes
+(--processes, the pre-fork mode). --clients client processes, each on one
+keep-alive connection, ask /api/quiz for --seconds; the clients are
+processes so the client side does not serialize on one GIL either. Needs
+os.fork, and more than one core to show any scaling.
+
+  python bench/prefork.py
+  python bench/prefork.py --processes 1 2 4 8 --clients 16 --seconds 10
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port, wait_ready
+
+PATH = "/api/quiz?direction=fr-it&n=10"
+
+
+def client(port, seconds, out):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    done = errors = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        try:
+            conn.request("GET", PATH)
+            r = conn.getresponse()
+            r.read()
+            done += r.status == 200
+            errors += r.status != 200
+            if r.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+    out.put((done, errors))
+
+
+def run(processes, args):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "--port", str(port),
+                               "--results", "", "--processes", str(processes)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, timeout=60)
+        time.sleep(1)
+        out = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(port, args.seconds, out))
+                   for _ in range(args.clients)]
+        for c in clients:
+            c.start()
+        results = [out.get() for _ in clients]
+        for c in clients:
+            c.join()
+    finally:
+        server.terminate()
+        server.wait()
+    done = sum(d for d, _ in results)
+    errors = sum(e for _, e in results)
+    print(f"--processes {processes:<3} {done / args.seconds:8.0f} requests/s{f'  {errors} errors' if errors else ''}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+    print(f"{args.clients} keep-alive clients on GET {PATH}, {os.cpu_count()} CPUs")
+    for n in args.processes:
+        run(n, args)
+
+
+if __name__ == "__main__":
+    main()
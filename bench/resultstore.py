@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Sustained insert throughput and query latency of results.ResultStore, on a
+temporary database filled with --answers graded answers (10-card games of 7
+answers on the verbs and tenses of decks/fr-it, --students students).
+
+Inserts are queued from --threads threads, as serve.py's workers do, and
+timed until everything is committed; the same games committed one
+transaction per game from one thread give the baseline. Queries are
+weakest() (the 20 weakest verb/tense pairs of a student, from the progress
+totals), the same ranking grouped from the raw answers, and persons().
+
+Last, --writers processes each open their own ResultStore on one file, as
+the workers of serve.py --processes do, and record games of the same
+students and verbs; every answer must be in the file afterwards.
+
+  python bench/resultstore.py
+  python bench/resultstore.py --answers 5000000 --students 5000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from deckstore import DeckStore
+import results
+
+GROUPED = """
+SELECT v.name, t.name, COUNT(*), SUM(ok) FROM answers
+JOIN names v ON v.id = verb JOIN names t ON t.id = tense
+WHERE student = (SELECT id FROM names WHERE name = ?) AND direction = (SELECT id FROM names WHERE name = ?)
+GROUP BY verb, tense ORDER BY (SUM(ok) + 1.0) / (COUNT(*) + 2.0), COUNT(*) DESC LIMIT 20
+"""
+
+
+def games(n, students, seed):
+    deck = DeckStore(os.path.join(ROOT, "decks")).get("fr-it")
+    tenses = list(deck.tenses())
+    rng = random.Random(seed)
+    for _ in range(n):
+        tense = rng.choice(tenses)
+        cards = [(deck.verbs[i].file, [rng.random() < 0.8 for _ in range(7)])
+                 for i in rng.sample(deck.by_tense[tense], min(10, len(deck.by_tense[tense])))]
+        yield f"student-{rng.randrange(students)}", "fr-it", tense, cards
+
+
+def latency(fn, args):
+    lat = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(*a)
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    return lat[len(lat) // 2] * 1e3, lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1e3
+
+
+def baseline(path, batch):
+    """One transaction per game, committed by the calling thread."""
+    store = results.ResultStore(path)
+    store.close()
+    conn = results.connect(path)
+    t0 = time.perf_counter()
+    for game in batch:
+        store.commit(conn, [(int(time.time()),) + game])
+    conn.close()
+    return time.perf_counter() - t0
+
+
+def write_part(path, part):
+    store = results.ResultStore(path)
+    for game in part:
+        store.record(*game)
+    store.close()
+
+
+def multi_writer(path, todo, writers):
+    """The games split over `writers` processes, one ResultStore each on path: (answers expected, answers in the file)."""
+    procs = [multiprocessing.Process(target=write_part, args=(path, todo[k::writers])) for k in range(writers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    conn = results.connect(path)
+    found = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+    conn.close()
+    return sum(len(c) * 7 for _, _, _, c in todo), found
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--answers", type=int, default=2000000)
+    ap.add_argument("--students", type=int, default=1000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--writers", type=int, default=3, help="processes writing one database at once")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="results-")
+    try:
+        n = args.answers // 70
+        todo = list(games(n, args.students, 1))
+        t = baseline(os.path.join(tmp, "baseline.sqlite3"), todo)
+        print(f"one transaction per game:    {n / t:8.0f} games/s {n * 70 / t:10.0f} answers/s")
+
+        path = os.path.join(tmp, "results.sqlite3")
+        store = results.ResultStore(path)
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=lambda part: [store.record(*g) for g in part], args=(todo[k::args.threads],))
+                   for k in range(args.threads)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        queued = time.perf_counter() - t0
+        store.flush()
+        wall = time.perf_counter() - t0
+        print(f"ResultStore, {args.threads} threads: {n / wall:8.0f} games/s {store.written / wall:10.0f} answers/s "
+              f"({store.written} answers in {wall:.1f} s; record() returned after {queued:.1f} s)")
+        print(f"database {os.path.getsize(path) / 2**20:.0f} MB")
+
+        rng = random.Random(2)
+        who = [(f"student-{rng.randrange(args.students)}", "fr-it") for _ in range(args.queries)]
+        w50, w99 = latency(lambda s, d: store.weakest(s, d, 20), who)
+        conn = store.reader()
+        g50, g99 = latency(lambda s, d: conn.execute(GROUPED, (s, d)).fetchall(), who)
+        pairs = [(s, d, p["verb"], p["tense"]) for s, d in who for p in store.weakest(s, d, 1)]
+        p50, p99 = latency(store.persons, pairs)
+        rows = args.answers / args.students
+        print(f"weakest(n=20), progress totals:  p50 {w50:6.2f} ms  p99 {w99:6.2f} ms")
+        print(f"same ranking grouped from answers: p50 {g50:6.2f} ms  p99 {g99:6.2f} ms  (~{rows:.0f} answers per student)")
+        print(f"persons(verb, tense):             p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+        store.close()
+
+        expected, found = multi_writer(os.path.join(tmp, "shared.sqlite3"), todo[:3000], args.writers)
+        print(f"{args.writers} writer processes, one file: {found} of {expected} answers recorded"
+              f"{'' if found == expected else '  LOST ANSWERS'}")
+        if found != expected:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Memory and latency of the spaced-repetition queues behind /api/next
+(scheduler.Scheduler), filled with --students students who each played
+--played verbs in every one of --tenses tenses, on a synthetic deck of
+--verbs distinct verbs (see bench/deckmem.py). Reviews are spread over the
+last 30 days, so part of every queue is due.
+
+  python bench/schedule.py
+  python bench/schedule.py --students 2000 --played 1000 --tenses 20
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from deckmem import synthetic
+from deckstore import DeckStore
+from scheduler import DAY, Scheduler
+
+
+def latency(fn, args):
+    lat = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(*a)
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    return lat[len(lat) // 2] * 1e6, lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--verbs", type=int, default=2000)
+    ap.add_argument("--students", type=int, default=1000)
+    ap.add_argument("--played", type=int, default=200, help="verbs played per student and tense")
+    ap.add_argument("--tenses", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="scheduler-")
+    try:
+        synthetic(os.path.join(tmp, "synthetic"), args.verbs)
+        deck = DeckStore(tmp).get("synthetic")
+        tenses = sorted(deck.tenses(), key=lambda t: -len(deck.by_tense[t]))[:args.tenses]
+        rng = random.Random(1)
+        now = int(time.time())
+
+        gc.collect()
+        tracemalloc.start()
+        scheduler = Scheduler()
+        t0 = time.perf_counter()
+        items = 0
+        for s in range(args.students):
+            for tense in tenses:
+                pool = deck.by_tense[tense]
+                for i in rng.sample(pool, min(args.played, len(pool))):
+                    scheduler.grade(f"student-{s}", deck.direction, tense, deck.verbs[i].file,
+                                    rng.choice((1, 3, 4, 5, 5)), now - rng.randrange(30 * DAY))
+                    items += 1
+        built = time.perf_counter() - t0
+        gc.collect()
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{args.students} students x {len(tenses)} tenses x {args.played} verbs played = {items} items "
+              f"in {built:.1f} s; {heap / 2**20:.0f} MB, {heap / items:.0f} bytes per item")
+
+        asks = [(deck, f"student-{rng.randrange(args.students)}", rng.choice(tenses), 10)
+                for _ in range(args.queries)]
+        n50, n99 = latency(scheduler.next, asks)
+        reviews = [(f"student-{rng.randrange(args.students)}", deck.direction, rng.choice(tenses),
+                    [(deck.verbs[i].file, [rng.random() < 0.8 for _ in range(7)])
+                     for i in rng.sample(range(len(deck)), 10)]) for _ in range(args.queries)]
+        r50, r99 = latency(scheduler.review, reviews)
+        print(f"next(n=10):            p50 {n50:6.1f} us  p99 {n99:6.1f} us")
+        print(f"review (10-card game): p50 {r50:6.1f} us  p99 {r99:6.1f} us")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput and server CPU time of serve.py sending a large static file, with
+os.sendfile (the default) and with --no-sendfile (the copy through Python
+buffers SimpleHTTPRequestHandler does). --clients keep-alive clients download
+a --mb MB file --rounds times each; CPU time is the server process's user +
+system time from /proc, so this needs Linux.
+
+  python bench/sendfile.py
+  python bench/sendfile.py --mb 256 --clients 8 --rounds 4
+"""
+
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port, wait_ready
+
+NAME = ".bench-sendfile.bin"   # served from the app directory, removed afterwards
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def client(port, rounds, size, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    for _ in range(rounds):
+        conn.request("GET", "/" + NAME)
+        r = conn.getresponse()
+        got = 0
+        while True:
+            chunk = r.read(1 << 20)
+            if not chunk:
+                break
+            got += len(chunk)
+        if got != size:
+            errors.append(got)
+    conn.close()
+
+
+def run(flags, args, size):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "--port", str(port),
+                               "--results", ""] + flags, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        client(port, 1, size, [])   # warm the page cache; lets the startup work (form index) finish
+        time.sleep(1)
+        cpu0, errors = cpu_seconds(server.pid), []
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(port, args.rounds, size, errors))
+                   for _ in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+        cpu = cpu_seconds(server.pid) - cpu0
+    finally:
+        server.terminate()
+        server.wait()
+    total = size * args.clients * args.rounds / 2**20
+    print(f"{'serve.py ' + ' '.join(flags):<26} {total / wall:8.0f} MB/s  server CPU {cpu:6.2f} s "
+          f"({cpu / total * 1e3:5.2f} ms per MB){'  ERRORS' if errors else ''}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=int, default=64, help="size of the file")
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--rounds", type=int, default=4, help="downloads per client")
+    args = ap.parse_args()
+
+    path = os.path.join(ROOT, NAME)
+    with open(path, "wb") as f:
+        for _ in range(args.mb):
+            f.write(os.urandom(1 << 20))
+    try:
+        print(f"{args.clients} clients x {args.rounds} downloads of a {args.mb} MB file")
+        run(["--no-sendfile"], args, args.mb << 20)
+        run([], args, args.mb << 20)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
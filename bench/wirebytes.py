@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Bytes on the wire (status line + headers + body) for one full deck load
+against serve.py, in the ways the app can load it:
+
+  per-file   index.json + every verb file, uncompressed
+  per-file   same, with Accept-Encoding: gzip
+  bundle     decks/fr-it/bundle.json, uncompressed / gzip
+  revisit    bundle.json again with If-None-Match (304)
+
+  python bench/wirebytes.py
+"""
+
+import http.client
+import io
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import ROOT, DECK, free_port, wait_ready
+
+
+class CountingReader(io.RawIOBase):
+    def __init__(self, counter):
+        self.counter = counter
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.counter.sock.recv_into(b)
+        self.counter.received += n
+        return n
+
+
+class CountingSocket:
+    """Socket wrapper whose response streams count the bytes they receive."""
+    def __init__(self, sock):
+        self.sock, self.received = sock, 0
+
+    def makefile(self, *args, **kwargs):
+        return io.BufferedReader(CountingReader(self))
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class CountingConnection(http.client.HTTPConnection):
+    received = 0
+
+    def connect(self):
+        super().connect()
+        self.sock = CountingSocket(self.sock)
+
+    def close(self):
+        if isinstance(self.sock, CountingSocket):
+            self.received += self.sock.received
+        super().close()
+
+
+def load(port, paths, headers):
+    c = CountingConnection("127.0.0.1", port)
+    etag = None
+    for p in paths:
+        c.request("GET", p, headers=headers)
+        r = c.getresponse()
+        r.read()
+        etag = r.getheader("ETag")
+    c.close()
+    return c.received, etag
+
+
+def main():
+    with open(os.path.join(DECK, "index.json"), encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    per_file = ["/decks/fr-it/index.json"] + [f"/decks/fr-it/{f}" for f in files]
+    bundle = ["/decks/fr-it/bundle.json"]
+    gz = {"Accept-Encoding": "gzip"}
+
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "serve.py", "--port", str(port), "--results", ""], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        rows = [("per-file", *load(port, per_file, {})[:1]),
+                ("per-file gzip", *load(port, per_file, gz)[:1])]
+        raw, _ = load(port, bundle, {})
+        zipped, etag = load(port, bundle, gz)
+        again, _ = load(port, bundle, dict(gz, **{"If-None-Match": etag}))
+        rows += [("bundle", raw), ("bundle gzip", zipped), ("revisit (304)", again)]
+    finally:
+        proc.terminate()
+        proc.wait()
+    base = rows[0][1]
+    for name, n in rows:
+        print(f"{name:<15} {n:>9} bytes  {n / base:7.1%}")
+
+
+if __name__ == "__main__":
+    main()
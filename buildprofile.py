@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+--profile for the deck generators (Create*.py, CreateVerbsFromList.py,
+deckbuild.py): where a build spends its time and memory, per phase and per
+tense, written to a JSON file that later runs can be compared with.
+
+deckbuild runs every step in phase(name), disjoint phases:
+
+  cache      .build-cache load/update, spec and output hashes, stat checks
+  conjugate  conjugation.build_json(), also split per "Mood|Tense" (tense())
+  json       json.dumps of verb files, index.json, manifest, shards, cache
+  write      compare with the file on disk + atomic replace
+  index      index.json / index.pending read and merge
+  read       verb files read back for the manifest and the shards
+  manifest   manifest.json built
+  shards     tenses/*.json built
+
+Under --profile each phase records its calls, wall time, the memory it left
+allocated and its peak above where it started (tracemalloc), and cProfile
+runs over the whole build for the function table (presente, compound,
+cong_pres, the JSON encoder...). Without it phase() hands out one shared
+no-op context.
+
+  python Create2ndGroupVerbs.py --force --profile        # Create2ndGroupVerbs.profile.json
+  python CreateVerbsFromList.py verbs.tsv --profile run1.json
+  python buildprofile.py run1.json run2.json             # phase by phase comparison
+
+Timings are taken with cProfile and tracemalloc on, which slow Python code
+down severalfold: compare profiles with each other, not with plain runs.
+Profiled builds conjugate in this process (workers=1) so that it is seen.
+The cProfile data is also saved next to the JSON (.pstats) for pstats or
+snakeviz.
+"""
+
+import cProfile, json, os, platform, pstats, sys, time, tracemalloc
+from contextlib import contextmanager, nullcontext
+
+NULL = nullcontext()
+ACTIVE = None      # the Profile of the running build, if any
+FUNCTIONS = 40     # rows of the function table
+
+def phase(name):
+    return NULL if ACTIVE is None else ACTIVE.phase(name, ACTIVE.phases)
+
+def tense(name):
+    """The context build_json() runs one tense in, while profiling."""
+    return NULL if ACTIVE is None else ACTIVE.phase(name, ACTIVE.tenses)
+
+def profile_path(argv, script):
+    """The --profile[=PATH] of a script parsing sys.argv itself; None without it."""
+    for arg in argv:
+        if arg == "--profile":
+            return os.path.splitext(os.path.basename(script))[0] + ".profile.json"
+        if arg.startswith("--profile="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+class Profile:
+    def __init__(self):
+        self.phases, self.tenses = {}, {}
+        self.peaks = []   # running traced-memory peak of each phase entered
+        self.peak = 0     # of the whole build, as reset_peak() keeps tracemalloc from knowing it
+
+    @contextmanager
+    def phase(self, name, table):
+        start, peak = tracemalloc.get_traced_memory()
+        if self.peaks:   # reset_peak() below would lose the enclosing phase's peak
+            self.peaks[-1] = max(self.peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self.peaks.append(start)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            end, peak = tracemalloc.get_traced_memory()
+            top = max(self.peaks.pop(), peak)
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], top)
+            else:
+                self.peak = max(self.peak, top)
+            s = table.get(name)
+            if s is None:
+                s = table[name] = {"calls": 0, "seconds": 0.0, "allocated": 0, "peak": 0}
+            s["calls"] += 1
+            s["seconds"] += seconds
+            s["allocated"] += end - start
+            s["peak"] = max(s["peak"], top - start)
+
+
+@contextmanager
+def profiling(path, label=None):
+    """
+    Profile the build run inside the block when path is set: print the
+    report and write it to path (and path minus .json + .pstats).
+    """
+    global ACTIVE
+    if not path:
+        yield None
+        return
+    ACTIVE, prof = Profile(), cProfile.Profile()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    prof.enable()
+    try:
+        yield ACTIVE
+    finally:
+        prof.disable()
+        wall = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        report = {"script": label or os.path.basename(sys.argv[0]), "argv": sys.argv[1:],
+                  "python": platform.python_version(), "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "wall": wall, "peak": max(peak, ACTIVE.peak),
+                  "phases": ACTIVE.phases, "tenses": ACTIVE.tenses, "functions": functions(prof)}
+        ACTIVE = None
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        prof.dump_stats(os.path.splitext(path)[0] + ".pstats")
+        print_report(report)
+        print(f"Profile written to {path}.")
+
+def functions(prof):
+    """The FUNCTIONS functions with the most time of their own."""
+    stats = pstats.Stats(prof).stats   # (file, line, name) -> (primitive calls, calls, tottime, cumtime, callers)
+    rows = sorted(stats.items(), key=lambda kv: -kv[1][2])[:FUNCTIONS]
+    return [{"function": f"{os.path.basename(file)}:{line}({name})" if line else name,
+             "calls": calls, "tottime": tottime, "cumtime": cumtime}
+            for (file, line, name), (_, calls, tottime, cumtime, _) in rows]
+
+def mb(n):
+    return f"{n / 2**20:8.2f} MB"
+
+def print_report(r, top=15):
+    print(f"{r['script']}: {r['wall']:.2f} s under the profiler, peak traced memory {mb(r['peak']).strip()}")
+    print(f"  {'phase':<36} {'calls':>8} {'seconds':>9} {'share':>6} {'kept':>11} {'peak':>11}")
+    for title, table in (("", r["phases"]), ("tense ", r["tenses"])):
+        for name, s in sorted(table.items(), key=lambda kv: -kv[1]["seconds"]):
+            print(f"  {title + name:<36} {s['calls']:>8} {s['seconds']:9.3f} {s['seconds'] / r['wall']:6.1%} "
+                  f"{mb(s['allocated'])} {mb(s['peak'])}")
+    other = r["wall"] - sum(s["seconds"] for s in r["phases"].values())
+    print(f"  {'(outside the phases)':<36} {'':>8} {other:9.3f} {other / r['wall']:6.1%}")
+    print(f"  {'function':<44} {'calls':>8} {'own s':>8} {'total s':>8}")
+    for f in r["functions"][:top]:
+        print(f"  {f['function'][:44]:<44} {f['calls']:>8} {f['tottime']:8.3f} {f['cumtime']:8.3f}")
+
+def compare(a, b):
+    """Phase and tense seconds of two profile files side by side."""
+    print(f"{'':<30} {'A s':>9} {'B s':>9} {'B/A':>7}")
+    print(f"{'wall':<30} {a['wall']:9.3f} {b['wall']:9.3f} {b['wall'] / a['wall']:7.2f}")
+    for title, key in (("", "phases"), ("tense ", "tenses")):
+        for name in sorted(set(a[key]) | set(b[key])):
+            x, y = a[key].get(name, {}).get("seconds", 0.0), b[key].get(name, {}).get("seconds", 0.0)
+            ratio = f"{y / x:7.2f}" if x else f"{'new':>7}"
+            print(f"{title + name:<30} {x:9.3f} {y:9.3f} {ratio}")
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python buildprofile.py PROFILE.json [OTHER.json]")
+    runs = []
+    for p in sys.argv[1:]:
+        with open(p, "r", encoding="utf-8") as f:
+            runs.append(json.load(f))
+    if len(runs) == 1:
+        print_report(runs[0])
+    else:
+        compare(*runs)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Italian conjugation engine shared by the deck generators (Create*.py).
+
+The rules are data: ending tables per conjugation group, auxiliary forms, the
+layout of a verb file. A verb is a Verb spec (infinitive, French lemma,
+auxiliary, group) plus its irregular overrides (PP, FUT_STEM, REMOTO, ISC...).
+
+  from conjugation import Verb, conjugate, build_json
+  v = Verb("scrivere", "écrire", "ecrire", "avere", "ere", pp="scritto", remoto=[...])
+  conjugate(v, "Indicativo", "Passato prossimo")   # ['io ho scritto', ...]
+  build_json(v)                                   # the whole decks/fr-it/<file>.json document
+
+Groups: "are" (1st conjugation, with the c/g -> ch/gh and -iare spelling
+rules), "ere" (2nd), "ire" (3rd, with isc=True for -isc- verbs) and
+"irregular" (present tense given, other simple tenses from stems/overrides).
+"""
+
+from functools import lru_cache
+
+FR_PRONOUNS = ["je", "tu", "il/elle", "nous", "vous", "ils/elles"]
+IT_PRONOUNS = ["io", "tu", "lui/lei", "noi", "voi", "loro"]
+
+# auxiliary forms: tense -> 6 forms, per auxiliary
+AUX = {
+    "avere": {
+        "pres": ("ho","hai","ha","abbiamo","avete","hanno"),
+        "impf": ("avevo","avevi","aveva","avevamo","avevate","avevano"),
+        "rem":  ("ebbi","avesti","ebbe","avemmo","aveste","ebbero"),
+        "fut":  ("avrò","avrai","avrà","avremo","avrete","avranno"),
+        "cond": ("avrei","avresti","avrebbe","avremmo","avreste","avrebbero"),
+        "cong_pres": ("abbia","abbia","abbia","abbiamo","abbiate","abbiano"),
+        "cong_impf": ("avessi","avessi","avesse","avessimo","aveste","avessero"),
+    },
+    "essere": {
+        "pres": ("sono","sei","è","siamo","siete","sono"),
+        "impf": ("ero","eri","era","eravamo","eravate","erano"),
+        "rem":  ("fui","fosti","fu","fummo","foste","furono"),
+        "fut":  ("sarò","sarai","sarà","saremo","sarete","saranno"),
+        "cond": ("sarei","saresti","sarebbe","saremmo","sareste","sarebbero"),
+        "cong_pres": ("sia","sia","sia","siamo","siate","siano"),
+        "cong_impf": ("fossi","fossi","fosse","fossimo","foste","fossero"),
+    },
+}
+AUX_FR = {"avere": "avoir", "essere": "être"}
+AUX_GERUND = {"avere": "avendo", "essere": "essendo"}
+
+# aux forms that take a plural participle with essere (masc. default: -o -> -i)
+PLURAL_AUX = ("siamo","siete","eravamo","eravate","saremo","sarete","fummo","foste")
+
+FUTURO = ("ò","ai","à","emo","ete","anno")
+CONDIZIONALE = ("ei","esti","ebbe","emmo","este","ebbero")
+
+# endings appended to the stem (infinitive minus its last 3 letters)
+GROUPS = {
+    "are": {
+        "regularity": {"fr": "1er groupe régulier (approx.)", "it": "prima coniugazione regolare"},
+        "presente":   ("o","i","a","iamo","ate","ano"),
+        "imperfetto": ("avo","avi","ava","avamo","avate","avano"),
+        "remoto":     ("ai","asti","ò","ammo","aste","arono"),
+        "cong_pres":  ("i","i","i","iamo","iate","ino"),
+        "cong_impf":  ("assi","assi","asse","assimo","aste","assero"),
+        "imperativo": ("a","i","iamo","ate","ino"),
+        "part_pres": "ante", "gerundio": "ando",
+    },
+    "ere": {
+        "regularity": {"fr": "2e groupe (-ere) avec irrégularités", "it": "seconda coniugazione (-ere)"},
+        "presente":   ("o","i","e","iamo","ete","ono"),
+        "imperfetto": ("evo","evi","eva","evamo","evate","evano"),
+        "remoto":     ("etti","esti","ette","emmo","este","ettero"),
+        "cong_pres":  ("a","a","a","iamo","iate","ano"),
+        "cong_impf":  ("essi","essi","esse","essimo","este","essero"),
+        "imperativo": ("i","a","iamo","ete","ano"),
+        "part_pres": "ente", "gerundio": "endo",
+    },
+    "ire": {
+        "regularity": {"fr": "3e groupe (-ire)", "it": "terza coniugazione (-ire)"},
+        "presente":   ("o","i","e","iamo","ite","ono"),
+        "imperfetto": ("ivo","ivi","iva","ivamo","ivate","ivano"),
+        "remoto":     ("ii","isti","ì","immo","iste","irono"),
+        "cong_pres":  ("a","a","a","iamo","iate","ano"),
+        "cong_impf":  ("issi","issi","isse","issimo","iste","issero"),
+        "imperativo": ("i","a","iamo","ite","ano"),
+        "part_pres": "ente", "gerundio": "endo",
+        # -isc- verbs (finire, capire...): presente / cong. pres. / imperativo
+        "isc": {
+            "presente":   ("isco","isci","isce","iamo","ite","iscono"),
+            "cong_pres":  ("isca","isca","isca","iamo","iate","iscano"),
+            "imperativo": ("isci","isca","iamo","ite","iscano"),
+        },
+    },
+    "irregular": {
+        "regularity": {"fr": "irrégulier", "it": "verbo irregolare"},
+        "imperfetto": ("vo","vi","va","vamo","vate","vano"),    # after the imperfetto stem
+        "cong_pres":  ("a","a","a","iamo","iate","ano"),       # after the stem of "io" presente
+        "cong_impf":  ("i","i","e","imo","te","ero"),          # after the -ss stem
+        "part_pres": "ente",
+    },
+}
+
+# passato remoto of irregular verbs without a REMOTO entry, by infinitive ending
+REMOTO_BY_ENDING = {
+    "are": ("ai","asti","ò","ammo","aste","arono"),
+    "ere": ("ei","esti","é","emmo","este","erono"),
+    "ire": ("ii","isti","ì","immo","iste","irono"),
+}
+
+
+class Verb:
+    """
+    One verb to generate. Overrides left to None fall back to the group rules.
+
+      pp            participio passato (required)
+      fut_stem      futuro/condizionale stem (default: infinitive minus -e)
+      remoto        6 passato remoto forms, no pronouns
+      isc           -ire verb with -isc- forms
+      presente      6 presente forms, no pronouns (required for irregular)
+      imperfetto    6 imperfetto forms, no pronouns (essere)
+      impf_stem     irregular imperfetto stem (fare -> "face")
+      cong_pres     6 congiuntivo presente forms, no "che"/pronouns
+      cong_impf_stem irregular congiuntivo imperfetto stem (fare -> "facess")
+      imperativo    6 imperativo forms, "—" first
+      gerundio      gerundio presente
+    """
+    __slots__ = ("infinitive", "source_lemma", "file", "aux", "group", "pp", "fut_stem", "remoto", "isc",
+                 "presente", "imperfetto", "impf_stem", "cong_pres", "cong_impf_stem", "imperativo", "gerundio")
+
+    def __init__(self, infinitive, source_lemma, file, aux, group, pp, fut_stem=None, remoto=None, isc=False,
+                 presente=None, imperfetto=None, impf_stem=None, cong_pres=None, cong_impf_stem=None,
+                 imperativo=None, gerundio=None):
+        self.infinitive, self.source_lemma, self.file = infinitive, source_lemma, file
+        self.aux, self.group, self.pp = aux, group, pp
+        self.fut_stem, self.remoto, self.isc = fut_stem, remoto, isc
+        self.presente, self.imperfetto, self.impf_stem = presente, imperfetto, impf_stem
+        self.cong_pres, self.cong_impf_stem = cong_pres, cong_impf_stem
+        self.imperativo, self.gerundio = imperativo, gerundio
+
+    @property
+    def stem(self):
+        return self.infinitive[:-3]
+
+    @property
+    def essere(self):
+        return self.aux == "essere"
+
+    def __repr__(self):
+        return f"Verb({self.infinitive!r}, {self.group!r})"
+
+
+def with_pronouns(forms, che=False):
+    return [f"che {p} {f}" if che else f"{p} {f}" for p, f in zip(IT_PRONOUNS, forms)]
+
+def endings(v, table):
+    """Ending table for a verb: the -isc- variant when the verb has one."""
+    group = GROUPS[v.group]
+    if v.isc and table in group.get("isc", {}):
+        return group["isc"][table]
+    return group[table]
+
+def attach(v, ending):
+    """stem + ending, with the -are spelling rules: cerc+i -> cerchi, mangi+i -> mangi, mangi+erò -> mangerò."""
+    stem = v.stem
+    if v.group == "are" and ending[:1] in ("e", "i"):
+        if stem.endswith(("c", "g")):
+            return stem + "h" + ending
+        if stem.endswith("i"):
+            return stem[:-1] + ending
+    return stem + ending
+
+@lru_cache(maxsize=None)
+def compound(aux, tense, pp):
+    """Compound tense with pronouns: aux forms of `tense` + past participle (agreed with essere)."""
+    out = []
+    for p, a in zip(IT_PRONOUNS, AUX[aux][tense]):
+        if aux == "essere" and (any(k in a for k in PLURAL_AUX) or a.endswith(("mo","te","no"))):
+            out.append(f"{p} {a} {pp[:-1] + 'i' if pp.endswith('o') else pp}")
+        else:
+            out.append(f"{p} {a} {pp}")
+    return tuple(out)
+
+@lru_cache(maxsize=None)
+def compound_che(aux, tense, pp):
+    """Congiuntivo compound tense: "che <pronoun> <aux> <pp>", no agreement."""
+    return tuple(f"{a} {pp}" for a in with_pronouns(AUX[aux][tense], che=True))
+
+
+# --- simple tenses, without pronouns ---
+
+def presente(v):
+    return v.presente if v.presente else [attach(v, e) for e in endings(v, "presente")]
+
+def imperfetto(v):
+    if v.imperfetto:
+        return v.imperfetto
+    if v.group == "irregular":
+        return [(v.impf_stem or v.stem) + e for e in endings(v, "imperfetto")]
+    return [attach(v, e) for e in endings(v, "imperfetto")]
+
+def passato_remoto(v):
+    if v.remoto:
+        return v.remoto
+    if v.group == "irregular":
+        return [v.stem + e for e in REMOTO_BY_ENDING[v.infinitive[-3:]]]
+    return [attach(v, e) for e in endings(v, "remoto")]
+
+def futuro_root(v):
+    if v.fut_stem:
+        return v.fut_stem
+    return attach(v, "er") if v.group == "are" else v.infinitive[:-1]   # parlare -> parler, else minus final -e
+
+def futuro_semplice(v):
+    return [futuro_root(v) + e for e in FUTURO]
+
+def condizionale_presente(v):
+    return [futuro_root(v) + e for e in CONDIZIONALE]
+
+def cong_pres(v):
+    if v.cong_pres:
+        return v.cong_pres
+    if v.group == "irregular":
+        pres1 = presente(v)[0]
+        base = pres1[:-2] if pres1.endswith("go") else pres1[:-1]
+        return [base + e for e in endings(v, "cong_pres")]
+    return [attach(v, e) for e in endings(v, "cong_pres")]
+
+def cong_impf(v):
+    if v.group == "irregular":
+        return [(v.cong_impf_stem or v.stem + "ss") + e for e in endings(v, "cong_impf")]
+    return [attach(v, e) for e in endings(v, "cong_impf")]
+
+def imperativo(v):
+    if v.imperativo:
+        return v.imperativo
+    if v.group == "irregular":
+        return ["—"] + presente(v)[1:]
+    return ["—"] + [attach(v, e) for e in endings(v, "imperativo")]
+
+def participio_presente(v):
+    return attach(v, GROUPS[v.group]["part_pres"])
+
+def gerundio_presente(v):
+    if v.gerundio:
+        return v.gerundio
+    if v.group == "irregular":
+        return v.stem + ("ando" if v.infinitive.endswith("are") else "endo")
+    return attach(v, GROUPS[v.group]["gerundio"])
+
+
+# (mood, tense) -> forms as stored in a verb file
+TENSES = {
+    ("Indicativo", "Presente"):            lambda v: with_pronouns(presente(v)),
+    ("Indicativo", "Passato prossimo"):    lambda v: list(compound(v.aux, "pres", v.pp)),
+    ("Indicativo", "Imperfetto"):          lambda v: with_pronouns(imperfetto(v)),
+    ("Indicativo", "Trapassato prossimo"): lambda v: list(compound(v.aux, "impf", v.pp)),
+    ("Indicativo", "Passato remoto"):      lambda v: with_pronouns(passato_remoto(v)),
+    ("Indicativo", "Trapassato remoto"):   lambda v: list(compound(v.aux, "rem", v.pp)),
+    ("Indicativo", "Futuro semplice"):     lambda v: with_pronouns(futuro_semplice(v)),
+    ("Indicativo", "Futuro anteriore"):    lambda v: list(compound(v.aux, "fut", v.pp)),
+    ("Condizionale", "Presente"):          lambda v: with_pronouns(condizionale_presente(v)),
+    ("Condizionale", "Passato"):           lambda v: list(compound(v.aux, "cond", v.pp)),
+    ("Congiuntivo", "Presente"):           lambda v: with_pronouns(cong_pres(v), che=True),
+    ("Congiuntivo", "Passato"):            lambda v: list(compound_che(v.aux, "cong_pres", v.pp)),
+    ("Congiuntivo", "Imperfetto"):         lambda v: with_pronouns(cong_impf(v), che=True),
+    ("Congiuntivo", "Trapassato"):         lambda v: list(compound_che(v.aux, "cong_impf", v.pp)),
+    ("Imperativo", "Presente"):            lambda v: list(imperativo(v)),
+    ("Infinito", "Presente"):              lambda v: [v.infinitive],
+    ("Infinito", "Passato"):               lambda v: [v.aux + " " + v.pp],
+    ("Participio", "Presente"):            lambda v: [participio_presente(v)],
+    ("Participio", "Passato"):             lambda v: [v.pp],
+    ("Gerundio", "Presente"):              lambda v: [gerundio_presente(v)],
+    ("Gerundio", "Passato"):               lambda v: [AUX_GERUND[v.aux] + " " + v.pp],
+}
+
+def conjugate(v, mood, tense):
+    """Forms of one tense as they appear in a verb file (with pronouns / "che" where the deck has them)."""
+    try:
+        rule = TENSES[(mood, tense)]
+    except KeyError:
+        raise KeyError(f"unknown tense {mood}|{tense}") from None
+    return rule(v)
+
+def regularity(v):
+    meta = dict(GROUPS[v.group]["regularity"])
+    if v.isc:
+        meta["it"] += " con -isc-"
+    return meta
+
+def build_json(v, timed=None):
+    """
+    The full verb document written to decks/fr-it/<file>.json. timed, if
+    given, is called with each "Mood|Tense" for a context to run it in
+    (buildprofile.tense, for --profile).
+    """
+    data = {
+        "source_lang": "fr",
+        "target_lang": "it",
+        "source_lemma": v.source_lemma,
+        "target_lemma": v.infinitive,
+        "meta": {
+            "regularity": regularity(v),
+            "auxiliary": { "fr": AUX_FR[v.aux], "it": v.aux }
+        },
+        "pronouns": { "fr": FR_PRONOUNS, "it": IT_PRONOUNS },
+    }
+    for mood, tense in TENSES:
+        if timed is None:
+            data.setdefault(mood, {})[tense] = conjugate(v, mood, tense)
+        else:
+            with timed(f"{mood}|{tense}"):
+                data.setdefault(mood, {})[tense] = conjugate(v, mood, tense)
+    return data
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Shared steps of the deck generators (Create*.py). generate() writes their verb
+files, merge_index() adds them to index.json, then write_derived() rebuilds
+the manifest and the tense shards.
+
+Builds are incremental: every file goes through write_text(), which leaves a
+file alone when it already holds the new content and otherwise replaces it
+atomically (temp file + rename), so unchanged files keep their mtime and the
+server/browser caches keyed on it stay valid. Verb files also skip the
+conjugation itself: .build-cache records, per file, a hash of the Verb spec
+and of the engine source, the hash of the output and the file's stat; when
+all of them still match, the verb is not regenerated. Pass force=True
+(--force on the Create*.py scripts) to regenerate everything; files whose
+content comes out identical are still not rewritten.
+
+Several generators can run at once: index.json and .build-cache are only
+read-modified-written under deck_lock(), an exclusive lock on <deck>/.lock.
+A run started with defer_index=True (--defer-index on the scripts) does not
+touch index.json at all; it appends its files to <deck>/index.pending, and
+finish() (what `python deckbuild.py` runs once all producers are done)
+folds every pending batch into index.json in one write and rebuilds the
+manifest and shards once.
+
+manifest.json (next to index.json) maps each "Mood|Tense" to the verb files
+that have all 6 persons for it, so the tense picker and the game pool can be
+built without opening every verb file:
+
+  {"verbs": 113, "files": [...],
+   "tenses": {"Indicativo|Presente": {"count": 113, "files": ["acheter.json", ...],
+                                      "shard": "tenses/Indicativo__Presente.json"}, ...}}
+
+tenses/<Mood>__<Tense>.json holds one tense of every verb that has it, so a
+game downloads one shard instead of whole verb files. The verb files stay the
+source of truth; shards are rewritten from them on every run.
+
+  {"mood": "Indicativo", "tense": "Presente", "source_lang": "fr", "target_lang": "it",
+   "pronouns": {"fr": [...], "it": [...]},
+   "verbs": [{"file", "source_lemma", "target_lemma", "forms"}, ...]}
+
+Shard-level pronouns apply to every verb; a verb with other pronouns (or an
+infinitive other than its target_lemma) carries its own "pronouns"/"infinitive".
+"""
+
+import hashlib, json, multiprocessing, os, sys
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+import buildprofile
+import conjugation
+from buildprofile import phase
+from conjugation import Verb, build_json
+from deckstore import infinitive, read_verbs, tense_keys
+
+SHARD_DIR = "tenses"
+BUILD_CACHE = ".build-cache"
+LOCK_FILE = ".lock"
+PENDING = "index.pending"
+
+def _sha1(data):
+    return hashlib.sha1(data.encode("utf-8") if isinstance(data, str) else data).hexdigest()
+
+# a change to the rules invalidates every cached verb
+with open(conjugation.__file__, "rb") as _f:
+    ENGINE = _sha1(_f.read())
+
+def write_text(path, text):
+    """Replace path with text (temp file + rename) unless it already holds it; True if written."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+@contextmanager
+def deck_lock(deck_dir):
+    """Exclusive lock on a deck's index.json, index.pending and .build-cache, across processes. Not reentrant."""
+    with open(os.path.join(deck_dir, LOCK_FILE), "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)   # gives up after 10 s, so retry
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def write_json(path, obj, **kw):
+    with phase("json"):
+        text = json.dumps(obj, ensure_ascii=False, **kw)
+    with phase("write"):
+        return write_text(path, text)
+
+def spec_hash(v):
+    """Hash of everything a verb file is generated from: its Verb fields and the engine."""
+    return _sha1(repr((ENGINE,) + tuple(getattr(v, k) for k in Verb.__slots__)))
+
+def _stat(path):
+    try:
+        s = os.stat(path)
+        return [s.st_size, s.st_mtime_ns]
+    except FileNotFoundError:
+        return None
+
+def load_cache(deck_dir):
+    try:
+        with open(os.path.join(deck_dir, BUILD_CACHE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def build_verb(v, deck_dir, entry=None, force=False):
+    """
+    Conjugate and write one verb unless its cache entry is still valid.
+    Returns (file name, new cache entry, generated, written).
+    """
+    name = f"{v.file}.json"
+    path = os.path.join(deck_dir, name)
+    with phase("cache"):
+        spec = spec_hash(v)
+        if not force and entry and entry[0] == spec and entry[2] == _stat(path):
+            return name, entry, False, False
+    with phase("conjugate"):
+        doc = build_json(v, buildprofile.tense if buildprofile.ACTIVE else None)
+    with phase("json"):
+        text = json.dumps(doc, ensure_ascii=False, indent=2)
+    with phase("cache"):
+        out = _sha1(text)
+        changed = force or not entry or entry[1] != out or entry[2] != _stat(path)
+    with phase("write"):
+        written = changed and write_text(path, text)
+    with phase("cache"):
+        return name, [spec, out, _stat(path)], True, written
+
+def _build_job(job):
+    return build_verb(*job)
+
+def write_verbs(verbs, deck_dir, force=False, workers=1, chunksize=64):
+    """
+    Write the verb files that changed. Returns (file names for index.json,
+    {"generated": n, "skipped": n, "written": n}): skipped verbs were not even
+    conjugated, generated ones were, and only those whose JSON differs from
+    the file on disk were written.
+
+    verbs can be any iterable (bulk lists are streamed). With workers > 1 the
+    verbs are conjugated and written by a process pool, chunksize verbs per
+    task (in this process when profiling); the file order, the cache and the
+    counts are the same as serially.
+    """
+    with phase("cache"):
+        cache, entries = load_cache(deck_dir), {}
+    files, counts = [], {"generated": 0, "skipped": 0, "written": 0}
+    jobs = ((v, deck_dir, cache.get(f"{v.file}.json"), force) for v in verbs)
+
+    def collect(results):
+        for name, entry, generated, written in results:
+            files.append(name)
+            entries[name] = entry
+            counts["generated" if generated else "skipped"] += 1
+            counts["written"] += written
+
+    if workers > 1 and buildprofile.ACTIVE is None:   # a profiled build conjugates here, to be seen
+        with multiprocessing.Pool(workers) as pool:
+            collect(pool.imap(_build_job, jobs, chunksize))
+    else:
+        collect(map(_build_job, jobs))
+    with deck_lock(deck_dir):   # another run may have updated the cache meanwhile
+        with phase("cache"):
+            cache = load_cache(deck_dir)
+            cache.update(entries)
+        write_json(os.path.join(deck_dir, BUILD_CACHE), cache, separators=(",", ":"), sort_keys=True)
+    return files, counts
+
+def shard_name(key):
+    """Shard path of a key: "Indicativo|Passato prossimo" -> tenses/Indicativo__Passato_prossimo.json"""
+    mood, tense = key.split("|", 1)
+    return f"{SHARD_DIR}/{mood}__{tense}.json".replace(" ", "_")
+
+def deck_verbs(deck_dir):
+    with phase("read"):
+        with open(os.path.join(deck_dir, "index.json"), "r", encoding="utf-8") as f:
+            files = json.load(f).get("files") or []
+        return read_verbs(deck_dir, files)
+
+def queue_index(deck_dir, new_files):
+    """Append new_files to index.pending; the next merge_index() adds them to index.json."""
+    if new_files:
+        with deck_lock(deck_dir), open(os.path.join(deck_dir, PENDING), "a", encoding="utf-8") as f:
+            f.write("".join(name + "\n" for name in new_files))
+
+def _merge_index(deck_dir, new_files):
+    index_path, pending_path = os.path.join(deck_dir, "index.json"), os.path.join(deck_dir, PENDING)
+    with phase("index"):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                files = json.load(f).get("files") or []
+        except FileNotFoundError:
+            files = []
+        try:
+            with open(pending_path, "r", encoding="utf-8") as f:
+                pending = [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            pending = None
+        files = list(dict.fromkeys(files + (pending or []) + list(new_files)))
+    write_json(index_path, {"files": files}, indent=2)
+    if pending is not None:
+        os.remove(pending_path)
+    return files
+
+def merge_index(deck_dir, new_files=()):
+    """
+    Add the pending batches and new_files to index.json, keeping the existing
+    order and dropping duplicates, under deck_lock(); only written if that
+    changes it.
+    """
+    with deck_lock(deck_dir):
+        return _merge_index(deck_dir, new_files)
+
+def build_manifest(verbs):
+    tenses = {}
+    for name, doc in verbs:
+        for key in tense_keys(doc):
+            tenses.setdefault(key, []).append(name)
+    return {
+        "verbs": len(verbs),
+        "files": [name for name, _ in verbs],
+        "tenses": {key: {"count": len(names), "files": names, "shard": shard_name(key)}
+                   for key, names in tenses.items()},
+    }
+
+def build_shards(verbs):
+    """{shard path: shard document} for every Mood|Tense with 6 forms somewhere in the deck."""
+    shards = {}
+    for name, doc in verbs:
+        for key in tense_keys(doc):
+            mood, tense = key.split("|", 1)
+            shard = shards.get(key)
+            if shard is None:
+                shard = shards[key] = {"mood": mood, "tense": tense,
+                                       "source_lang": doc.get("source_lang"), "target_lang": doc.get("target_lang"),
+                                       "pronouns": doc.get("pronouns"), "verbs": []}
+            entry = {"file": name, "source_lemma": doc.get("source_lemma"), "target_lemma": doc.get("target_lemma"),
+                     "forms": doc[mood][tense]}
+            if doc.get("pronouns") != shard["pronouns"]:
+                entry["pronouns"] = doc.get("pronouns")
+            if infinitive(doc) != doc.get("target_lemma"):
+                entry["infinitive"] = infinitive(doc)
+            shard["verbs"].append(entry)
+    return {shard_name(key): shard for key, shard in shards.items()}
+
+def write_manifest(deck_dir, verbs=None):
+    verbs = deck_verbs(deck_dir) if verbs is None else verbs
+    with phase("manifest"):
+        manifest = build_manifest(verbs)
+    write_json(os.path.join(deck_dir, "manifest.json"), manifest, indent=2)
+    return manifest
+
+def write_tense_shards(deck_dir, verbs=None):
+    """Write tenses/*.json (compact JSON, they are only read by the app) and drop shards of vanished tenses."""
+    verbs = deck_verbs(deck_dir) if verbs is None else verbs
+    with phase("shards"):
+        shards = build_shards(verbs)
+    os.makedirs(os.path.join(deck_dir, SHARD_DIR), exist_ok=True)
+    for rel, shard in shards.items():
+        write_json(os.path.join(deck_dir, rel), shard, separators=(",", ":"))
+    with phase("write"):
+        for name in os.listdir(os.path.join(deck_dir, SHARD_DIR)):
+            if name.endswith(".json") and f"{SHARD_DIR}/{name}" not in shards:
+                os.remove(os.path.join(deck_dir, SHARD_DIR, name))
+    return shards
+
+def write_derived(deck_dir):
+    """manifest.json and the tense shards, from one read of the deck."""
+    verbs = deck_verbs(deck_dir)
+    return write_manifest(deck_dir, verbs), write_tense_shards(deck_dir, verbs)
+
+def generate(verbs, deck_dir, force=False, workers=1, defer_index=False):
+    """
+    Everything a Create*.py script does: verb files, index.json (merged once),
+    manifest and shards. With defer_index the files are only queued in
+    index.pending, for one merge_index() + write_derived() after all producers.
+    Returns the counts.
+    """
+    os.makedirs(deck_dir, exist_ok=True)
+    files, counts = write_verbs(verbs, deck_dir, force, workers)
+    if defer_index:
+        queue_index(deck_dir, files)
+    else:
+        with deck_lock(deck_dir):   # the derived files must match the index they were built from
+            _merge_index(deck_dir, files)
+            write_derived(deck_dir)
+    counts["files"] = files
+    return counts
+
+def finish(deck_dir):
+    """Merge the pending batches into index.json and rebuild the manifest and shards."""
+    with deck_lock(deck_dir):
+        files = _merge_index(deck_dir, ())
+        return files, write_derived(deck_dir)
+
+if __name__ == "__main__":
+    with buildprofile.profiling(buildprofile.profile_path(sys.argv[1:], __file__)):
+        files, (m, shards) = finish(os.path.join("decks", "fr-it"))
+    print(f"index.json: {len(files)} files; manifest.json: {m['verbs']} verbs, {len(m['tenses'])} tenses; "
+          f"{len(shards)} tense shards.")
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Decks held in memory for serve.py.
+
+A deck is decks/<direction>/index.json plus the verb files it lists. DeckStore
+loads a deck on first use, indexes it by "Mood|Tense" (only tenses with the
+6 persons filled in, like the app's tense picker) and by lemma, and reloads
+it when index.json or one of the listed files changes.
+
+Verbs are kept as VerbRecord (__slots__) rather than the parsed JSON. Most
+of a verb file is its forms, nearly all distinct strings that repeat a
+pronoun or "che <pronoun>", so a record holds a tuple with one packed string
+per tense: the forms without that prefix, tab-separated, after a one-letter
+style ("p" pronoun, "c" che + pronoun, "-" as is; see pack()). The layout of
+a file (key order, moods and tenses) is one Shape shared by every verb with
+the same layout, and the other top-level values (pronouns, meta) are interned
+and shared between verbs that have equal ones. VerbRecord.forms_of() and
+to_dict() give back the forms and the document exactly as read.
+`python bench/deckmem.py` compares the memory with json.load.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+DECK_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "decks")
+
+# top-level keys of a verb file that are not moods
+META_KEYS = ("source_lang", "target_lang", "source_lemma", "target_lemma", "meta", "pronouns")
+
+PERSONS = ("io", "tu", "lui/lei", "noi", "voi", "loro")
+PREFIXES = {"p": tuple(p + " " for p in PERSONS), "c": tuple(f"che {p} " for p in PERSONS)}
+
+
+def deck_signature(deck_dir):
+    """(files listed in index.json, tuple of (name, mtime_ns, size) for index.json and each file)."""
+    def st(path):
+        s = os.stat(path)
+        return (s.st_mtime_ns, s.st_size)
+    index_path = os.path.join(deck_dir, "index.json")
+    with open(index_path, "r", encoding="utf-8") as f:
+        files = json.load(f).get("files") or []
+    sig = [("index.json",) + st(index_path)]
+    for name in files:
+        try:
+            sig.append((name,) + st(os.path.join(deck_dir, name)))
+        except FileNotFoundError:
+            sig.append((name, None, None))
+    return files, tuple(sig)
+
+
+def iter_verbs(deck_dir, files):
+    """(file name, verb document) for the readable files, one at a time; broken ones are skipped like the app does."""
+    for name in files:
+        try:
+            with open(os.path.join(deck_dir, name), "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+        yield name, doc
+
+
+def read_verbs(deck_dir, files):
+    """[(file name, verb document)] for the readable files."""
+    return list(iter_verbs(deck_dir, files))
+
+
+def tense_keys(doc):
+    """"Mood|Tense" keys of a verb document that have exactly 6 forms."""
+    for mood, tenses in doc.items():
+        if mood in META_KEYS or not isinstance(tenses, dict):
+            continue
+        for tense, forms in tenses.items():
+            if isinstance(forms, list) and len(forms) == 6:
+                yield f"{mood}|{tense}"
+
+
+def infinitive(doc):
+    """Same lookup as getExpectedInfinitive() in app.js."""
+    return ((doc.get("Infinito") or {}).get("Presente") or [None])[0] \
+        or ((doc.get("Infinitif") or {}).get("Présent") or [None])[0] \
+        or doc.get("target_lemma") or ""
+
+
+def pack(forms):
+    """
+    One tense as a single string (see the module docstring); a tuple when it
+    cannot be packed, or is empty ("-" alone is [""]).
+    """
+    if not forms or not all(isinstance(f, str) and "\t" not in f for f in forms):
+        return tuple(forms)
+    if len(forms) == 6:
+        for style, prefixes in PREFIXES.items():
+            if all(f.startswith(p) for f, p in zip(forms, prefixes)):
+                return sys.intern(style + "\t".join(f[len(p):] for f, p in zip(forms, prefixes)))
+    return sys.intern("-" + "\t".join(forms))
+
+def unpack(packed):
+    """pack() reversed: the forms as a tuple."""
+    if isinstance(packed, tuple):
+        return packed
+    forms = packed[1:].split("\t")
+    prefixes = PREFIXES.get(packed[0])
+    return tuple(p + f for p, f in zip(prefixes, forms)) if prefixes else tuple(forms)
+
+
+class Shape:
+    """
+    Layout of a verb document: items is ((key, None), ...) for plain values and
+    ((mood, (tense, ...)), ...) for moods, in document order; index maps
+    "Mood|Tense" to the position of its forms in VerbRecord.forms and plain
+    maps the other keys to their position in VerbRecord.values.
+    """
+    __slots__ = ("items", "index", "plain")
+
+    def __init__(self, items):
+        self.items = items
+        self.index, self.plain = {}, {}
+        for mood, tenses in items:
+            if tenses is None:
+                self.plain[mood] = len(self.plain)
+            for tense in tenses or ():
+                self.index[f"{mood}|{tense}"] = len(self.index)
+
+
+class VerbRecord:
+    __slots__ = ("file", "source_lemma", "target_lemma", "infinitive", "shape", "values", "forms")
+
+    def forms_of(self, key):
+        """Forms of a "Mood|Tense" as a tuple, or None if the verb does not have it."""
+        i = self.shape.index.get(key)
+        return None if i is None else unpack(self.forms[i])
+
+    def value(self, key, default=None):
+        """A top-level value that is not a mood (source_lang, pronouns, meta...)."""
+        i = self.shape.plain.get(key)
+        return default if i is None else self.values[i]
+
+    def to_dict(self):
+        """The verb document as read from its file (plain values are shared: do not modify them)."""
+        doc, values, forms = {}, iter(self.values), iter(self.forms)
+        for key, tenses in self.shape.items:
+            doc[key] = next(values) if tenses is None else {tense: list(unpack(next(forms))) for tense in tenses}
+        return doc
+
+
+class Interner:
+    """Builds VerbRecords for one deck, sharing shapes, plain values and form tuples between verbs."""
+    def __init__(self):
+        self.shapes, self.values = {}, {}
+
+    def value(self, obj):
+        if isinstance(obj, str):
+            return sys.intern(obj)
+        key = json.dumps(obj, ensure_ascii=False)
+        hit = self.values.get(key)
+        if hit is None:
+            if isinstance(obj, dict):
+                hit = {sys.intern(k): self.value(v) for k, v in obj.items()}
+            elif isinstance(obj, list):
+                hit = [self.value(x) for x in obj]
+            else:
+                hit = obj
+            self.values[key] = hit
+        return hit
+
+    def record(self, name, doc):
+        items, values, forms = [], [], []
+        for key, val in doc.items():
+            if key not in META_KEYS and isinstance(val, dict) and all(isinstance(f, list) for f in val.values()):
+                items.append((sys.intern(key), tuple(sys.intern(t) for t in val)))
+                forms.extend(pack(f) for f in val.values())
+            else:
+                items.append((sys.intern(key), None))
+                values.append(self.value(val))
+        items = tuple(items)
+        shape = self.shapes.get(items)
+        if shape is None:
+            shape = self.shapes[items] = Shape(items)
+        r = VerbRecord()
+        r.file = sys.intern(name)
+        r.source_lemma, r.target_lemma = self.value(doc.get("source_lemma")), self.value(doc.get("target_lemma"))
+        r.infinitive = sys.intern(infinitive(doc))
+        r.shape, r.values, r.forms = shape, tuple(values), tuple(forms)
+        return r
+
+
+class Deck:
+    def __init__(self, direction, signature, files, verbs):
+        self.direction = direction
+        self.signature = signature
+        self.files = files
+        interner = Interner()
+        self.verbs = [interner.record(name, doc) for name, doc in verbs]   # any iterable: docs are not kept
+        self.by_tense = {}   # "Mood|Tense" -> [verb position], in deck order
+        self.by_lemma = {}   # source or target lemma -> [verb position]
+        self.by_file = {v.file: i for i, v in enumerate(self.verbs)}
+        for i, v in enumerate(self.verbs):
+            for key, j in v.shape.index.items():
+                if len(unpack(v.forms[j])) == 6:
+                    self.by_tense.setdefault(key, []).append(i)
+            for lemma in dict.fromkeys((v.source_lemma, v.target_lemma)):
+                if isinstance(lemma, str):
+                    self.by_lemma.setdefault(lemma, []).append(i)
+
+    def __len__(self):
+        return len(self.verbs)
+
+    def docs(self):
+        """Every verb document, as read from the files."""
+        return [v.to_dict() for v in self.verbs]
+
+    def lemma(self, lemma):
+        """VerbRecords whose French or Italian lemma is lemma ("penser" or "pensare")."""
+        return [self.verbs[i] for i in self.by_lemma.get(lemma, ())]
+
+    def tense(self, key):
+        """[(VerbRecord, forms)] for every verb with all 6 forms of "Mood|Tense"."""
+        return [(self.verbs[i], self.verbs[i].forms_of(key)) for i in self.by_tense.get(key, ())]
+
+    def tenses(self):
+        """{"Mood|Tense": number of verbs} in the order the app lists them."""
+        return {key: len(ids) for key, ids in self.by_tense.items()}
+
+    def card(self, i, tense=None):
+        """A verb reduced to what one quiz card needs: lemmas, pronouns, infinitive and one tense."""
+        v = self.verbs[i]
+        out = {"file": v.file}
+        for key in ("source_lang", "target_lang", "source_lemma", "target_lemma", "pronouns"):
+            if key in v.shape.plain:
+                out[key] = v.value(key)
+        out["infinitive"] = v.infinitive
+        if tense:
+            mood, name = tense.split("|", 1)
+            out[mood] = {name: list(v.forms_of(tense))}
+        return out
+
+    def quiz(self, tense=None, n=10, rng=random):
+        """
+        n random cards for a tense (any verb when tense is None). Sampling picks
+        from the precomputed per-tense list, so it costs O(n), not a deck scan.
+        Raises KeyError for a tense no verb has.
+        """
+        ids = self.by_tense[tense] if tense else range(len(self.verbs))
+        return [self.card(i, tense) for i in rng.sample(ids, min(n, len(ids)))]
+
+
+class DeckStore:
+    """
+    Decks by direction. A deck's files are re-stated at most every `recheck`
+    seconds (0: on every get), so hot endpoints do not pay ~0.5 ms of stat()
+    calls per request; a regenerated deck shows up within that delay.
+    """
+    def __init__(self, root=DECK_ROOT, recheck=0.0):
+        self.root = root
+        self.recheck = recheck
+        self.lock = threading.Lock()
+        self.decks = {}     # direction -> Deck
+        self.checked = {}   # direction -> time.monotonic() of the last signature check
+        self.hits = self.loads = 0   # gets answered by a loaded deck / decks (re)loaded
+
+    def get(self, direction):
+        """The up-to-date Deck for a direction, or None if it has no index.json."""
+        deck = self.decks.get(direction)
+        if deck is not None and time.monotonic() - self.checked.get(direction, 0) < self.recheck:
+            self.hits += 1   # unlocked: may undercount a little under contention
+            return deck
+        deck_dir = os.path.join(self.root, direction)
+        try:
+            files, sig = deck_signature(deck_dir)
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            return None
+        with self.lock:
+            deck = self.decks.get(direction)
+            if deck is None or deck.signature != sig:
+                deck = self.decks[direction] = Deck(direction, sig, files, iter_verbs(deck_dir, files))
+                self.loads += 1
+            else:
+                self.hits += 1
+            self.checked[direction] = time.monotonic()
+            return deck
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+Reverse form index: from any conjugated form back to verb, mood, tense and
+person.
+
+Every form of a deck is indexed twice, normalized the way app.js compares
+answers (normalize(): trim, lowercase, accents stripped, spaces collapsed):
+the full form ("che loro siano partiti") and the bare form without "che" and
+the pronoun, as bareForm() strips them ("siano partiti"). One-form tenses
+(Infinito, Participio, Gerundio) are indexed as they are, with person None.
+
+  index = FormIndex(DeckStore().get("fr-it"))
+  index.lookup("dissero")   # [{"file": "dire.json", "mood": "Indicativo", "tense": "Passato remoto", "person": 5, ...}]
+  index.ambiguous()         # bare forms shared by several verbs
+  index.complete("diss")    # [{"text": "dissero", ...}, ...] type-ahead over forms and lemmas
+  index.near("ha andato")   # [{"text": "è andato", "distance": 2, "matches": [...]}, ...]
+
+near() diagnoses a wrong answer: BK-trees over the bare forms, one per length
+and built on first use, find the real forms within a few edits (Myers'
+bit-parallel Levenshtein distance) while comparing only a small part of the
+lexicon.
+
+serve.py answers GET /api/lookup?form=..., GET /api/complete?prefix=... and
+GET /api/diagnose?answer=... from a Lexicon, which rebuilds the index of a
+deck in a thread when DeckStore reloads it, answering from the old index
+until the new one and its BK-trees are built.
+
+  python lexicon.py                 # index stats, ambiguous forms, lookup time
+  python lexicon.py dissero "sarebbero partiti"
+  python lexicon.py --near faciate "ha andato"
+"""
+
+import re, sys, threading, time, unicodedata
+from array import array
+
+from deckstore import PERSONS, DeckStore
+
+ACCENTS = re.compile("[\u0300-\u036f]")
+SPACES = re.compile(r"\s+")
+
+def normalize(s):
+    """Same as normalize() in app.js."""
+    s = str(s or "").strip().lower()
+    if not s.isascii():
+        s = ACCENTS.sub("", unicodedata.normalize("NFD", s))
+    return SPACES.sub(" ", s)
+
+def bare_form(full, pronoun):
+    """Same as bareForm() in app.js: drop "che " and the pronoun."""
+    s = (full or "").lower().strip()
+    if s.startswith("che "):
+        s = s[4:].strip()
+    p = (pronoun or "").lower().strip()
+    if p and s.startswith(p + " "):
+        s = s[len(p) + 1:].strip()
+    return s
+
+
+def measure(a):
+    """
+    distance(a, .) as a function, with a's bit masks computed once: Myers'
+    bit-parallel Levenshtein (Hyyrö's formulation), one pass of integer
+    operations per character of the other string.
+    """
+    m = len(a)
+    if not m:
+        return len
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    ones, last = (1 << m) - 1, 1 << (m - 1)
+
+    def dist(b):
+        pv, mv, score = ones, 0, m
+        for c in b:
+            eq = peq.get(c, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & ones)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & ones
+            mh = (mh << 1) & ones
+            pv = mh | (~(xv | ph) & ones)
+            mv = ph & xv
+        return score
+    return dist
+
+def distance(a, b):
+    """Levenshtein distance (insertions, deletions, substitutions)."""
+    return measure(a)(b)
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over strings under distance(): each node keeps its
+    children by their distance to it, so a search within k only descends into
+    children at distance d-k..d+k of the query (triangle inequality). Nodes
+    hold ids; word(id) gives the string, so the strings are not stored twice.
+    """
+    def __init__(self, word, ids=()):
+        self.word = word
+        self.ids = array("L")
+        self.children = []   # node -> None or {distance: node}
+        for i in ids:
+            self.add(i)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, i):
+        dist = measure(self.word(i))
+        self.ids.append(i)
+        self.children.append(None)
+        node, new = 0, len(self.ids) - 1
+        while new:
+            d = dist(self.word(self.ids[node]))
+            if d == 0:   # duplicate word
+                self.ids.pop()
+                self.children.pop()
+                return
+            kids = self.children[node]
+            if kids is None:
+                kids = self.children[node] = {}
+            if d not in kids:
+                kids[d] = new
+                return
+            node = kids[d]
+
+    def search(self, query, k):
+        """[(distance, id)] of the words within k of query, nearest first."""
+        out, stack, dist = [], [0] if self.ids else [], measure(query)
+        while stack:
+            node = stack.pop()
+            d = dist(self.word(self.ids[node]))
+            if d <= k:
+                out.append((d, self.ids[node]))
+            kids = self.children[node]
+            if kids:
+                stack.extend(c for dd, c in kids.items() if d - k <= dd <= d + k)
+        return sorted(out)
+
+
+class FormIndex:
+    """
+    A sorted array of every normalized form and lemma of a deck, kept compact
+    for decks of thousands of verbs (about 35 bytes per key instead of ~150 for
+    a dict of strings and lists):
+
+      blob      the keys joined by "\n", in sorted order; key j is
+                blob[starts[j]:starts[j + 1] - 1]
+      forms     array of hits per key: one int packing verb position, tense
+                id, person and full/bare (see hit()), -1 if the key is only a
+                lemma, or -2-n for the n-th tuple in multi when several verbs,
+                tenses or persons share the form
+      lemmas    array of verb positions per key (French or Italian lemma),
+                -1 or -2-n the same way
+
+    lookup() and complete() find keys by binary search.
+    """
+    def __init__(self, deck):
+        self.deck = deck
+        self.tenses, self.tense_ids = [], {}   # tense id <-> "Mood|Tense"
+        forms, lemmas = {}, {}
+        for i, v in enumerate(deck.verbs):
+            pronouns = (v.value("pronouns") or {}).get("it") or PERSONS
+            for lemma in (v.source_lemma, v.target_lemma):
+                if isinstance(lemma, str):
+                    self.add(lemmas, normalize(lemma), i)
+            for key in v.shape.index:
+                k = self.tense_ids.get(key)
+                if k is None:
+                    k = self.tense_ids[key] = len(self.tenses)
+                    self.tenses.append(key)
+                all_forms = v.forms_of(key)
+                for person, full in enumerate(all_forms):
+                    if not isinstance(full, str) or full == "—":   # imperativo has no "io" form
+                        continue
+                    person = person if len(all_forms) == 6 else None
+                    self.add(forms, normalize(full), self.hit(i, k, person, False))
+                    if person is not None:
+                        bare = bare_form(full, pronouns[person] if person < len(pronouns) else "")
+                        self.add(forms, normalize(bare), self.hit(i, k, person, True))
+
+        keys = sorted(forms.keys() | lemmas.keys())
+        self.multi = []
+        self.blob = "\n".join(keys) + "\n"
+        self.starts = array("L", [0])
+        for key in keys:
+            self.starts.append(self.starts[-1] + len(key) + 1)
+        self.forms = array("q", (self.pack(forms.get(key, -1)) for key in keys))
+        self.lemmas = array("q", (self.pack(lemmas.get(key, -1)) for key in keys))
+        self.nforms, self.nlemmas = len(forms), len(lemmas)
+        self.infinitives = array("q")   # verb position -> key of its expected infinitive, -1 if none
+        for v in deck.verbs:
+            j = self.find(normalize(v.infinitive))
+            self.infinitives.append(-1 if j is None else j)
+        self.lock, self.bktrees, self.building = threading.Lock(), None, False
+
+    @staticmethod
+    def hit(i, k, person, bare):
+        return ((i * 1024 + k) * 7 + (6 if person is None else person)) * 2 + bare
+
+    def unhit(self, h):
+        """hit() reversed: (verb position, "Mood|Tense", person, bare)."""
+        h, bare = divmod(h, 2)
+        h, person = divmod(h, 7)
+        i, k = divmod(h, 1024)
+        return i, self.tenses[k], None if person == 6 else person, bool(bare)
+
+    @staticmethod
+    def add(table, key, h):
+        """Add a hit while building; the bare copy of a one-form tense (same verb, tense, person) is dropped."""
+        cur = table.get(key)
+        if cur is None:
+            table[key] = h
+        elif isinstance(cur, int):
+            if cur >> 1 != h >> 1:
+                table[key] = (cur, h)
+        elif all(x >> 1 != h >> 1 for x in cur):
+            table[key] = cur + (h,)
+
+    def pack(self, cur):
+        if isinstance(cur, int):
+            return cur
+        self.multi.append(cur)
+        return -1 - len(self.multi)
+
+    def unpack(self, v):
+        return () if v == -1 else (v,) if v >= 0 else self.multi[-2 - v]
+
+    def __len__(self):
+        return len(self.forms)
+
+    def key(self, j):
+        return self.blob[self.starts[j]:self.starts[j + 1] - 1]
+
+    def bisect(self, key):
+        """Position of the first key >= key."""
+        lo, hi = 0, len(self.forms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        j = self.bisect(key)
+        return j if j < len(self.forms) and self.key(j) == key else None
+
+    def hits(self, form):
+        j = self.find(normalize(form))
+        return () if j is None else self.unpack(self.forms[j])
+
+    def count(self, form):
+        return len(self.hits(form))
+
+    def match(self, h):
+        i, key, person, bare = self.unhit(h)
+        v = self.deck.verbs[i]
+        mood, tense = key.split("|", 1)
+        return {"file": v.file, "source_lemma": v.source_lemma, "target_lemma": v.target_lemma,
+                "mood": mood, "tense": tense, "person": person,
+                "form": v.forms_of(key)[person or 0], "match": "bare" if bare else "full"}
+
+    def lookup(self, form, limit=None):
+        """Every (verb, mood, tense, person) whose full or bare form normalizes like form, in deck order."""
+        return [self.match(h) for h in self.hits(form)[:limit]]
+
+    def display(self, j):
+        """Key j as written in the deck (accents kept): the first form or lemma it comes from."""
+        for h in self.unpack(self.forms[j])[:1]:
+            i, tense, person, bare = self.unhit(h)
+            v = self.deck.verbs[i]
+            full = v.forms_of(tense)[person or 0]
+            if not bare:
+                return full
+            pronouns = (v.value("pronouns") or {}).get("it") or PERSONS
+            return bare_form(full, pronouns[person] if person < len(pronouns) else "")
+        key = self.key(j)
+        for i in self.unpack(self.lemmas[j])[:1]:
+            v = self.deck.verbs[i]
+            return next(l for l in (v.source_lemma, v.target_lemma) if isinstance(l, str) and normalize(l) == key)
+        return key
+
+    def complete(self, prefix, limit=10):
+        """
+        Up to limit keys starting with prefix (normalized; a trailing space is
+        kept, so "io " completes to forms with a pronoun), in sorted order:
+        [{"text": as written in the deck, "key", "forms": number of form hits, "lemma": bool}].
+        """
+        p = normalize(prefix) + (" " if prefix[-1:].isspace() and prefix.strip() else "")
+        out, lo = [], self.bisect(p)
+        for j in range(lo, min(len(self.forms), lo + limit)):
+            key = self.key(j)
+            if not key.startswith(p):
+                break
+            out.append({"text": self.display(j), "key": key, "forms": len(self.unpack(self.forms[j])),
+                        "lemma": self.lemmas[j] != -1})
+        return out
+
+    def trees(self, wait=True):
+        """
+        {length: BK-tree} of the bare forms (and one-form tenses), built on
+        first use; with wait=False, None until they are built, the build being
+        started in a thread.
+        """
+        if not wait:
+            if self.bktrees is None and not self.building:
+                self.building = True
+                threading.Thread(target=self.trees, daemon=True).start()
+            return self.bktrees
+        with self.lock:
+            if self.bktrees is None:
+                by_length = {}
+                for j, v in enumerate(self.forms):
+                    if any(self.unhit(h)[3] or self.unhit(h)[2] is None for h in self.unpack(v)):
+                        by_length.setdefault(len(self.key(j)), []).append(j)
+                self.bktrees = {n: BKTree(self.key, ids) for n, ids in by_length.items()}
+            return self.bktrees
+
+    def near(self, answer, k=2, limit=10):
+        """
+        Real forms within edit distance k of a (wrong) answer, nearest first:
+        [{"text", "key", "distance", "matches": lookup() of that form}]. The
+        answer is compared without "che" and pronoun, like the app accepts it.
+        """
+        a = normalize(answer)
+        if a.startswith("che "):
+            a = a[4:]
+        for p in PERSONS + ("lui", "lei"):
+            if a.startswith(p + " "):
+                a = a[len(p) + 1:]
+                break
+        trees, found = self.trees(), []
+        for n in range(len(a) - k, len(a) + k + 1):   # a word more than k longer or shorter is farther than k
+            if n in trees:
+                found += trees[n].search(a, k)
+        return [{"text": self.display(j), "key": self.key(j), "distance": d,
+                 "matches": self.lookup(self.key(j), limit)}
+                for d, j in sorted(found)[:limit]]
+
+    def grade(self, i, tense, answers):
+        """
+        Grade one card the way gradeCurrent() in app.js does: answers[0] is the
+        infinitive of verb i, answers[1:7] the six persons of tense ("Mood|Tense",
+        None for an infinitive-only card), each right if it normalizes to the
+        full or the bare form. The expected side is the keys indexed at load, so
+        only the answers are normalized: [bool] per cell.
+        """
+        v = self.deck.verbs[i]
+        got = normalize(answers[0] if answers else "")
+        j = self.infinitives[i]
+        out = [got == normalize(v.infinitive) if j == -1 else self.find(got) == j]
+        if tense is None:
+            return out
+        forms, k = v.forms_of(tense) or (), self.tense_ids.get(tense)
+        for person in range(6):
+            got = normalize(answers[person + 1] if person + 1 < len(answers) else "")
+            full = forms[person] if person < len(forms) else None
+            if k is None or not isinstance(full, str) or full == "—" or len(forms) != 6:   # not indexed
+                out.append(isinstance(full, str) and got == normalize(full))
+                continue
+            j = self.find(got)
+            hits = () if j is None else self.unpack(self.forms[j])
+            h = self.hit(i, k, person, False)
+            out.append(h in hits or h + 1 in hits)
+        return out
+
+    def ambiguous(self):
+        """{normalized form: number of verbs} for forms that belong to more than one verb."""
+        out = {}
+        for j, v in enumerate(self.forms):
+            if v < -1:
+                verbs = len({self.unhit(h)[0] for h in self.multi[-2 - v]})
+                if verbs > 1:
+                    out[self.key(j)] = verbs
+        return out
+
+
+class Lexicon:
+    """
+    FormIndex per direction, rebuilt when the DeckStore hands out a new Deck.
+    The rebuild (index and BK-trees, seconds at 10,000 verbs) runs in a
+    thread, and the old index keeps answering, for the old deck, until it is
+    done; only the first index of a direction is built by its caller.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.cache = {}      # direction -> FormIndex
+        self.building = {}   # direction -> the Deck whose index a thread is building
+        self.failed = {}     # direction -> the last Deck whose rebuild raised, not tried again
+        self.hits = self.builds = 0
+
+    def get(self, direction):
+        deck = self.store.get(direction)
+        return None if deck is None else self.of(deck)
+
+    def of(self, deck):
+        """
+        The FormIndex of a Deck the store returned, or of the deck it replaces
+        while that one is being indexed: callers use index.deck, not deck.
+        """
+        with self.lock:
+            index = self.cache.get(deck.direction)
+            if index is not None:
+                if index.deck is not deck and deck not in (self.building.get(deck.direction),
+                                                           self.failed.get(deck.direction)):
+                    self.building[deck.direction] = deck
+                    threading.Thread(target=self.rebuild, args=(deck,), daemon=True).start()
+                self.hits += 1
+                return index
+        return self.build(deck)
+
+    def rebuild(self, deck):
+        """
+        build() in a thread, trees included. If it raises, the old index goes
+        on answering and this deck is not tried again: the next change to the
+        deck files gives a new Deck, which is.
+        """
+        try:
+            self.build(deck, True)
+        except Exception as e:
+            print(f"lexicon: index of {deck.direction} not rebuilt, serving the previous one: {e!r}", file=sys.stderr)
+            with self.lock:
+                self.failed[deck.direction] = deck
+        finally:
+            with self.lock:
+                if self.building.get(deck.direction) is deck:
+                    del self.building[deck.direction]
+
+    def build(self, deck, trees=False):
+        index = FormIndex(deck)
+        if trees:
+            index.trees()
+        with self.lock:
+            self.builds += 1
+            if self.building.get(deck.direction) is deck:
+                del self.building[deck.direction]
+            elif deck.direction in self.cache:   # a newer deck is being built, or another caller was first
+                return self.cache[deck.direction]
+            self.cache[deck.direction] = index
+            return index
+
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    index = FormIndex(DeckStore().get("fr-it"))
+    built = time.perf_counter() - t0
+    if sys.argv[1:2] == ["--near"]:
+        for answer in sys.argv[2:]:
+            for m in index.near(answer):
+                print(f"{answer!r}: {m['text']!r} at {m['distance']}: " +
+                      ", ".join(f"{x['file']} {x['mood']}|{x['tense']} person {x['person']}" for x in m["matches"]))
+        sys.exit()
+    if sys.argv[1:]:
+        for form in sys.argv[1:]:
+            for m in index.lookup(form):
+                print(f"{form!r}: {m['file']} {m['mood']}|{m['tense']} person {m['person']} ({m['match']}: {m['form']})")
+        sys.exit()
+    amb = index.ambiguous()
+    keys = [index.key(j) for j in range(len(index))]
+    t0 = time.perf_counter()
+    for k in keys:
+        index.lookup(k)
+    per = (time.perf_counter() - t0) / len(keys) * 1e6
+    print(f"{index.nforms} distinct forms and {index.nlemmas} lemmas from {len(index.deck)} verbs, "
+          f"built in {built * 1000:.0f} ms; lookup {per:.1f} µs on average")
+    print(f"{len(amb)} forms shared by several verbs, e.g. " +
+          ", ".join(f"{f!r} ({n})" for f, n in sorted(amb.items(), key=lambda x: -x[1])[:8]))
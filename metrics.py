@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Request metrics of serve.py and aserve.py, rendered in the Prometheus text
+format for GET /metrics.
+
+  METRICS = Metrics()
+  METRICS.started()                                   # a request line was read
+  METRICS.finished("quiz", 200, 0.0031, 2048)         # route, status, seconds, body bytes
+  METRICS.render([("serve_cache_hits_total", "counter", "...", [({"cache": "static"}, 12)])])
+
+Per route: a latency histogram, the response body bytes and a count per
+status; plus the requests in flight. Routes are a fixed set of names (see
+serve.route_name()), never raw paths, so the series stay few. Each update
+takes one lock for a handful of additions.
+"""
+
+import bisect
+import threading
+
+# upper bounds in seconds; +Inf is implicit
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def labels(pairs):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}" if pairs else ""
+
+
+def sample(name, pairs, value):
+    return f"{name}{labels(pairs)} {value:g}\n" if isinstance(value, float) else f"{name}{labels(pairs)} {value}\n"
+
+
+class Metrics:
+    def __init__(self, prefix="serve"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.routes = {}     # route -> [count per bucket (last: +Inf), seconds, requests, body bytes]
+        self.statuses = {}   # (route, status) -> responses
+
+    def started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finished(self, route, status, seconds, sent):
+        """One answered request (status None if no response was sent)."""
+        with self.lock:
+            self.in_flight -= 1
+            r = self.routes.get(route)
+            if r is None:
+                r = self.routes[route] = [[0] * (len(BUCKETS) + 1), 0.0, 0, 0]
+            r[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+            r[1] += seconds
+            r[2] += 1
+            r[3] += sent
+            key = (route, status or 0)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def render(self, extra=()):
+        """
+        The text exposition of everything recorded, followed by extra:
+        (name, type, help, [(labels, value)]) families the caller owns
+        (cache counters, queue lengths).
+        """
+        p = self.prefix
+        with self.lock:
+            in_flight = self.in_flight
+            routes = {k: (list(v[0]), v[1], v[2], v[3]) for k, v in self.routes.items()}
+            statuses = dict(self.statuses)
+        out = [f"# HELP {p}_request_duration_seconds Time to answer a request, from its request line.\n",
+               f"# TYPE {p}_request_duration_seconds histogram\n"]
+        for route, (counts, seconds, n, _) in sorted(routes.items()):
+            total = 0
+            for le, c in zip(BUCKETS + ("+Inf",), counts):
+                total += c
+                out.append(sample(f"{p}_request_duration_seconds_bucket", {"route": route, "le": le}, total))
+            out.append(sample(f"{p}_request_duration_seconds_sum", {"route": route}, float(seconds)))
+            out.append(sample(f"{p}_request_duration_seconds_count", {"route": route}, n))
+        families = [
+            (f"{p}_response_bytes_total", "counter", "Response body bytes sent.",
+             [({"route": route}, v[3]) for route, v in sorted(routes.items())]),
+            (f"{p}_responses_total", "counter", "Responses by route and status code.",
+             [({"route": route, "code": code}, n) for (route, code), n in sorted(statuses.items())]),
+            (f"{p}_requests_in_flight", "gauge", "Requests being answered.", [({}, in_flight)]),
+        ]
+        for name, kind, help_text, samples in families + list(extra):
+            out.append(f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n")
+            out.extend(sample(name, pairs, value) for pairs, value in samples)
+        return "".join(out)
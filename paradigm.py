@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Paradigm-compressed decks: each verb file stored as the generator inputs it
+comes from (a conjugation.Verb spec: infinitive, group, aux, pp and the
+irregular overrides such as fut_stem or remoto) plus a patch for whatever
+build_json() of that spec does not reproduce. expand() rebuilds the original
+file byte for byte.
+
+  {"format": "paradigm/1", "verbs": [
+     {"file": "penser", "spec": {"infinitive": "pensare", "source_lemma": "penser", "aux": "avere",
+                                 "group": "are", "pp": "pensato"}},
+     {"file": "manger", "spec": {...}, "patch": {"meta": {...}, "Indicativo": {"Presente": [...]}}, "crlf": 1},
+     {"file": "aimer", "text": "..."}, ...]}
+
+The spec is inferred from the file itself (the group from the infinitive, or
+"irregular"; an override only where it fixes a tense), so hand-written -are
+files and generator bugs round-trip too. A patch maps keys to replaced values,
+nested dicts to nested patches, with "$del" (keys to drop) and "$order" (key
+order) when needed. Files not laid out like json.dumps(indent=2) are kept
+verbatim in "text".
+
+  python paradigm.py                     # round-trip every verb file of decks/fr-it, print the size ratio
+  python paradigm.py --write deck.paradigm.json
+  python paradigm.py --expand deck.paradigm.json --out /tmp/fr-it
+"""
+
+import argparse, gzip, json, os, sys
+
+from conjugation import AUX, GROUPS, IT_PRONOUNS, Verb, build_json, conjugate
+
+FORMAT = "paradigm/1"
+DECK_DIR = os.path.join("decks", "fr-it")
+NOT_VERBS = ("index.json", "manifest.json")
+
+# Verb override -> (mood, tense, "che" forms) it is read from
+OVERRIDES = (
+    ("presente",   "Indicativo",  "Presente",   False),
+    ("imperfetto", "Indicativo",  "Imperfetto", False),
+    ("remoto",     "Indicativo",  "Passato remoto", False),
+    ("cong_pres",  "Congiuntivo", "Presente",   True),
+)
+
+def bare(forms, che=False):
+    """6 forms without "che"/pronouns, or None if they do not have the deck's prefixes."""
+    if not isinstance(forms, list) or len(forms) != 6:
+        return None
+    out = []
+    for p, f in zip(IT_PRONOUNS, forms):
+        prefix = f"che {p} " if che else f"{p} "
+        if not isinstance(f, str) or not f.startswith(prefix):
+            return None
+        out.append(f[len(prefix):])
+    return out
+
+def tense(doc, mood, name):
+    return (doc.get(mood) or {}).get(name) if isinstance(doc.get(mood), dict) else None
+
+def matches(v, doc, mood, name):
+    try:
+        return conjugate(v, mood, name) == tense(doc, mood, name)
+    except (KeyError, IndexError, TypeError):
+        return False
+
+def try_override(v, field, value, doc, *tenses):
+    """Set v.field = value if that makes the tenses match the file; keep it only then."""
+    if value is None or all(matches(v, doc, m, t) for m, t in tenses):
+        return
+    old = getattr(v, field)
+    setattr(v, field, value)
+    if not all(matches(v, doc, m, t) for m, t in tenses):
+        setattr(v, field, old)
+
+def stem_of(forms, ending):
+    return forms[0][:-len(ending)] if forms and forms[0].endswith(ending) else None
+
+def guess(name, doc, group, isc=False):
+    """The Verb for one candidate group, with the overrides that reproduce the file's tenses."""
+    inf = doc.get("target_lemma") or ""
+    aux = ((doc.get("meta") or {}).get("auxiliary") or {}).get("it")
+    aux = aux if aux in AUX else "avere"
+    pp = (tense(doc, "Participio", "Passato") or [None])[0]
+    if not pp:
+        pp = ((tense(doc, "Indicativo", "Passato prossimo") or [""])[0] or "").rsplit(" ", 1)[-1]
+    v = Verb(inf, doc.get("source_lemma"), name, aux, group, pp, isc=isc)
+    if group == "irregular":
+        v.presente = bare(tense(doc, "Indicativo", "Presente"))
+        if v.presente is None:
+            return None
+        impf = bare(tense(doc, "Indicativo", "Imperfetto"))
+        try_override(v, "impf_stem", stem_of(impf, "vo"), doc, ("Indicativo", "Imperfetto"))
+        cong = bare(tense(doc, "Congiuntivo", "Imperfetto"), che=True)
+        try_override(v, "cong_impf_stem", stem_of(cong, "i"), doc, ("Congiuntivo", "Imperfetto"))
+    for field, mood, name_, che in OVERRIDES:
+        try_override(v, field, bare(tense(doc, mood, name_), che), doc, (mood, name_))
+    fut = bare(tense(doc, "Indicativo", "Futuro semplice"))
+    try_override(v, "fut_stem", stem_of(fut, "ò"), doc, ("Indicativo", "Futuro semplice"),
+                 ("Condizionale", "Presente"))
+    imp = tense(doc, "Imperativo", "Presente")
+    try_override(v, "imperativo", list(imp) if isinstance(imp, list) and len(imp) == 6 else None, doc,
+                 ("Imperativo", "Presente"))
+    ger = tense(doc, "Gerundio", "Presente")
+    try_override(v, "gerundio", ger[0] if isinstance(ger, list) and ger else None, doc, ("Gerundio", "Presente"))
+    return v
+
+def diff(base, doc):
+    """Patch that turns base into doc (see the module docstring)."""
+    out = {}
+    for k, val in doc.items():
+        if k in base and base[k] == val:
+            continue
+        if isinstance(val, dict):
+            out[k] = diff(base[k] if isinstance(base.get(k), dict) else {}, val)
+        else:
+            out[k] = val
+    gone = [k for k in base if k not in doc]
+    if gone:
+        out["$del"] = gone
+    if list(apply(base, out)) != list(doc):
+        out["$order"] = list(doc)
+    return out
+
+def apply(base, patch):
+    out = {k: val for k, val in base.items() if k not in patch.get("$del", ())}
+    for k, val in patch.items():
+        if k in ("$del", "$order"):
+            continue
+        out[k] = apply(out[k] if isinstance(out.get(k), dict) else {}, val) if isinstance(val, dict) else val
+    if "$order" in patch:
+        out = {k: out[k] for k in patch["$order"]}
+    return out
+
+def spec_of(v):
+    return {k: getattr(v, k) for k in Verb.__slots__ if k != "file" and getattr(v, k) not in (None, False)}
+
+def encode(name, raw):
+    """One verb file (name without .json, raw text) -> its compact entry."""
+    crlf = "\r\n" in raw
+    doc = json.loads(raw)
+    if json.dumps(doc, ensure_ascii=False, indent=2).replace("\n", "\r\n" if crlf else "\n") != raw:
+        return {"file": name, "text": raw}
+    inf = doc.get("target_lemma") or ""
+    groups = [(inf[-3:], False)] if inf[-3:] in GROUPS else []
+    groups += [("ire", True)] if inf.endswith("ire") else []
+    best = None
+    for group, isc in groups + [("irregular", False)]:
+        v = guess(name, doc, group, isc)
+        try:
+            entry = {"file": name, "spec": spec_of(v), "patch": diff(build_json(v), doc)} if v else None
+        except (KeyError, IndexError, TypeError):
+            continue
+        if entry and (best is None or len(json.dumps(entry)) < len(json.dumps(best))):
+            best = entry
+    if best is None:
+        return {"file": name, "text": raw}
+    if not best["patch"]:
+        del best["patch"]
+    if crlf:
+        best["crlf"] = 1
+    return best
+
+def expand(entry):
+    """Compact entry -> the verb file's exact text."""
+    if "text" in entry:
+        return entry["text"]
+    doc = apply(build_json(Verb(file=entry["file"], **entry["spec"])), entry.get("patch", {}))
+    text = json.dumps(doc, ensure_ascii=False, indent=2)
+    return text.replace("\n", "\r\n") if entry.get("crlf") else text
+
+def verb_files(deck_dir):
+    return sorted(n for n in os.listdir(deck_dir) if n.endswith(".json") and n not in NOT_VERBS)
+
+def read_raw(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+def encode_deck(deck_dir):
+    return {"format": FORMAT,
+            "verbs": [encode(n[:-5], read_raw(os.path.join(deck_dir, n))) for n in verb_files(deck_dir)]}
+
+def dumps(deck):
+    return json.dumps(deck, ensure_ascii=False, separators=(",", ":"))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Encode a deck as verb specs + overrides and check the round trip.")
+    ap.add_argument("--deck", default=DECK_DIR)
+    ap.add_argument("--write", metavar="PATH", help="write the compact deck")
+    ap.add_argument("--expand", metavar="PATH", help="compact deck to expand into --out")
+    ap.add_argument("--out", metavar="DIR")
+    args = ap.parse_args(argv)
+
+    if args.expand:
+        if not args.out:
+            ap.error("--expand needs --out")
+        with open(args.expand, "r", encoding="utf-8") as f:
+            deck = json.load(f)
+        os.makedirs(args.out, exist_ok=True)
+        for entry in deck["verbs"]:
+            with open(os.path.join(args.out, entry["file"] + ".json"), "w", encoding="utf-8", newline="") as f:
+                f.write(expand(entry))
+        print(f"Expanded {len(deck['verbs'])} verb files into {args.out}.")
+        return 0
+
+    deck = encode_deck(args.deck)
+    compact = dumps(deck)
+    raw_total, failed = 0, []
+    for entry in json.loads(compact)["verbs"]:   # check what a reader of the written file gets
+        raw = read_raw(os.path.join(args.deck, entry["file"] + ".json"))
+        raw_total += len(raw.encode("utf-8"))
+        if expand(entry) != raw:
+            failed.append(entry["file"])
+    kinds = [("text" in e, "patch" in e) for e in deck["verbs"]]
+    print(f"{len(kinds)} verb files: {kinds.count((False, False))} pure spec, {kinds.count((False, True))} spec + patch, "
+          f"{kinds.count((True, False))} verbatim; round trip {'OK' if not failed else 'FAILED: ' + ', '.join(failed)}")
+    raw_gz = sum(len(gzip.compress(read_raw(os.path.join(args.deck, n)).encode("utf-8"), 9))
+                 for n in verb_files(args.deck))
+    packed = compact.encode("utf-8")
+    print(f"verb files {raw_total / 1024:.1f} KB -> {len(packed) / 1024:.1f} KB ({raw_total / len(packed):.1f}x); "
+          f"gzipped: {raw_gz / 1024:.1f} KB per file -> {len(gzip.compress(packed, 9)) / 1024:.1f} KB")
+    if args.write:
+        with open(args.write, "w", encoding="utf-8") as f:
+            f.write(compact)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Per-student results of graded games, kept in SQLite for serve.py.
+
+Every graded answer is one row of `answers` (student, direction, verb file,
+"Mood|Tense", person 0-5 or NULL for the infinitive, ok, and the id of its
+game in `games`). `progress` keeps
+the running totals per student, verb and tense, so "my weakest pairs" reads a
+few hundred rows of one student instead of grouping millions of answers.
+Students, directions, verbs and tenses are stored as ids into `names`, which
+keeps rows and index entries small.
+
+Writes never wait for the disk: record() queues a game and a background
+thread commits whatever has queued up in one transaction (up to BATCH games),
+inserting the answers and upserting the totals together. The database is in
+WAL mode, so readers on other threads are not blocked by the writer.
+
+  store = ResultStore("results.sqlite3")
+  store.record("ana", "fr-it", "Indicativo|Presente", [("dire.json", [True, True, False, ...])])
+  store.weakest("ana", "fr-it", n=20)   # [{"verb", "tense", "asked", "correct"}], lowest success first
+  store.close()                         # commits what is still queued
+
+  python results.py results.sqlite3 ana     # the 20 weakest verb/tense pairs of a student
+"""
+
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+INFINITIVE = "Infinito|Presente"   # tense the infinitive answer of each card is recorded under
+BATCH = 200                        # games per transaction at most
+QUEUE_MAX = 10000                  # queued games before record() waits for the writer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    id        INTEGER PRIMARY KEY,
+    name      TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    id        INTEGER PRIMARY KEY,
+    ts        INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS answers (
+    ts        INTEGER NOT NULL,
+    student   INTEGER NOT NULL,
+    direction INTEGER NOT NULL,
+    verb      INTEGER NOT NULL,
+    tense     INTEGER NOT NULL,
+    person    INTEGER,
+    ok        INTEGER NOT NULL,
+    game      INTEGER             -- NULL in rows recorded before games existed
+);
+CREATE INDEX IF NOT EXISTS answers_by_pair ON answers (student, direction, verb, tense);
+CREATE TABLE IF NOT EXISTS progress (
+    student   INTEGER NOT NULL,
+    direction INTEGER NOT NULL,
+    verb      INTEGER NOT NULL,
+    tense     INTEGER NOT NULL,
+    asked     INTEGER NOT NULL,
+    correct   INTEGER NOT NULL,
+    last      INTEGER NOT NULL,
+    PRIMARY KEY (student, direction, verb, tense)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO progress (student, direction, verb, tense, asked, correct, last) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (student, direction, verb, tense) DO UPDATE SET
+    asked = asked + excluded.asked, correct = correct + excluded.correct, last = excluded.last
+"""
+
+# success rate smoothed toward 1/2, so one miss is not weaker than ten misses out of eleven
+WEAKEST = """
+SELECT v.name, t.name, asked, correct FROM progress
+JOIN names v ON v.id = verb JOIN names t ON t.id = tense
+WHERE student = (SELECT id FROM names WHERE name = ?) AND direction = (SELECT id FROM names WHERE name = ?)
+ORDER BY (correct + 1.0) / (asked + 2.0), asked DESC
+LIMIT ?
+"""
+
+PERSONS = """
+SELECT person, COUNT(*), SUM(ok) FROM answers
+WHERE student = (SELECT id FROM names WHERE name = ?) AND direction = (SELECT id FROM names WHERE name = ?)
+  AND verb = (SELECT id FROM names WHERE name = ?) AND tense = (SELECT id FROM names WHERE name = ?)
+GROUP BY person
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")   # durable at each WAL checkpoint, not each commit
+    return conn
+
+
+def rows_of(ts, student, direction, tense, cards, infinitive, game):
+    """answers rows of one game: cards are (verb, [ok per answer]) as /api/grade returns them."""
+    for verb, ok in cards:
+        if ok:
+            yield ts, student, direction, verb, infinitive, None, int(ok[0]), game
+        if tense:
+            for person, cell in enumerate(ok[1:7]):
+                yield ts, student, direction, verb, tense, person, int(cell), game
+
+
+class ResultStore:
+    def __init__(self, path, batch=BATCH):
+        self.path = path
+        self.batch = batch
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        if "game" not in [c[1] for c in conn.execute("PRAGMA table_info(answers)")]:   # older file
+            conn.execute("ALTER TABLE answers ADD COLUMN game INTEGER")
+        conn.close()
+        self.local = threading.local()   # one reading connection per thread
+        self.pending = queue.Queue(QUEUE_MAX)
+        self.written = 0                 # answers committed so far
+        self.ids = None                  # name -> id in names, for the writer
+        self.writer = threading.Thread(target=self._write, name="results-writer", daemon=True)
+        self.writer.start()
+
+    def record(self, student, direction, tense, cards):
+        """Queue one graded game; tense None for an infinitive-only game."""
+        self.pending.put((int(time.time()), student, direction, tense, cards))
+
+    def flush(self):
+        """Wait until everything queued so far is committed."""
+        done = threading.Event()
+        self.pending.put(done)
+        done.wait()
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:   # this thread's reader
+            conn.close()
+            self.local.conn = None
+
+    def _write(self):
+        conn = connect(self.path)
+        stop = False
+        while not stop:
+            items = [self.pending.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            games, waiting = [], []
+            for item in items:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiting.append(item)
+                else:
+                    games.append(item)
+            if games:
+                try:
+                    self.commit(conn, games)
+                except sqlite3.Error as e:   # keep serving; the batch is lost
+                    print(f"results: {len(games)} games not recorded: {e}", file=sys.stderr)
+            for done in waiting:
+                done.set()
+        conn.close()
+
+    def commit(self, conn, games):
+        """Insert the answers of games and add them to the totals, in one transaction."""
+        if self.ids is None:
+            self.ids = {name: i for i, name in conn.execute("SELECT id, name FROM names")}
+        ids = self.ids
+
+        def id_of(name):
+            i = ids.get(name)
+            if i is None:   # another store on the file (a pre-fork worker) may have inserted it already
+                conn.execute("INSERT OR IGNORE INTO names (name) VALUES (?)", (name,))
+                i = ids[name] = conn.execute("SELECT id FROM names WHERE name = ?", (name,)).fetchone()[0]
+            return i
+
+        rows, totals = [], {}
+        try:
+            with conn:
+                infinitive = id_of(INFINITIVE)
+                for ts, student, direction, tense, cards in games:
+                    game = conn.execute("INSERT INTO games (ts) VALUES (?)", (ts,)).lastrowid
+                    rows.extend(rows_of(ts, id_of(student), id_of(direction), tense and id_of(tense),
+                                        [(id_of(verb), ok) for verb, ok in cards], infinitive, game))
+                for ts, student, direction, verb, tense, _, ok, _ in rows:
+                    t = totals.setdefault((student, direction, verb, tense), [0, 0, ts])
+                    t[0] += 1
+                    t[1] += ok
+                    t[2] = ts
+                conn.executemany("INSERT INTO answers (ts, student, direction, verb, tense, person, ok, game) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany(UPSERT, [k + tuple(v) for k, v in totals.items()])
+        except sqlite3.Error:
+            self.ids = None   # names inserted by the rolled back transaction are gone too
+            raise
+        self.written += len(rows)
+
+    def reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = connect(self.path)
+        return conn
+
+    def weakest(self, student, direction, n=20):
+        """The n verb/tense pairs a student gets wrong most often."""
+        return [{"verb": verb, "tense": tense, "asked": asked, "correct": correct}
+                for verb, tense, asked, correct in self.reader().execute(WEAKEST, (student, direction, n))]
+
+    def reviews(self, after=0):
+        """
+        (last rowid, ts, student, direction, verb, tense, asked, correct) per
+        graded card and tense committed after rowid `after`, in commit order.
+        A game is committed in one transaction, so its cards come whole, and
+        grouped by its id, so two games grading a verb in the same second
+        stay two reviews (rows from before games existed group by ts).
+        """
+        return self.reader().execute(
+            "SELECT MAX(a.rowid), ts, s.name, d.name, v.name, t.name, COUNT(*), SUM(ok) FROM answers a "
+            "JOIN names s ON s.id = student JOIN names d ON d.id = direction "
+            "JOIN names v ON v.id = verb JOIN names t ON t.id = tense "
+            "WHERE a.rowid > ? GROUP BY game, ts, student, direction, verb, tense ORDER BY MIN(a.rowid)", (after,))
+
+    def persons(self, student, direction, verb, tense):
+        """[asked, correct] per person (None: the infinitive) of one verb and tense."""
+        out = {}
+        for person, asked, correct in self.reader().execute(PERSONS, (student, direction, verb, tense)):
+            out[person] = [asked, correct]
+        return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python results.py DATABASE STUDENT [DIRECTION]")
+    store = ResultStore(sys.argv[1])
+    for p in store.weakest(sys.argv[2], sys.argv[3] if sys.argv[3:] else "fr-it"):
+        print(f"{p['verb']:<24} {p['tense']:<36} {p['correct']:>5} / {p['asked']:<5}")
+    store.close()
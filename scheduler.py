@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Spaced repetition for serve.py: which cards a student should play next.
+
+Each student has one queue per direction and "Mood|Tense" (infinitive-only
+games use INFINITIVE). A queue holds the verbs the student has been graded
+on, as a heap keyed by due time, with their SM-2 state (ease factor,
+interval, repetitions); verbs never played are not stored and come after
+the due ones, in an order of their own per student (see Queue.fresh()).
+
+  scheduler = Scheduler()
+  scheduler.next(deck, "ana", "Indicativo|Presente", 10)   # [(verb position, due or None if new)]
+  scheduler.review("ana", "fr-it", "Indicativo|Presente", [("dire.json", [True, True, False, ...])])
+
+next() pops the k earliest entries and pushes them back, O(k log n) for n
+verbs in the queue; the verbs never played cost a walk over the pool that
+grows as they get rare (Queue.fresh()). A review that moves a verb's due time
+pushes a new entry and leaves the old one in the heap; stale entries are
+skipped when popped and dropped when they outnumber the live ones. Heap entries and states are single ints (see Queue), so a
+queue costs about 100 bytes per verb played.
+
+Grading follows SM-2 (SuperMemo 2): the quality of a card is 5 minus its
+wrong persons, so two mistakes out of six still pass (3) and more send the
+verb back to a one-day interval. The infinitive answer of every card also
+reviews the verb's INFINITIVE item, the one infinitive-only games play.
+
+serve.py rebuilds the queues from results.ResultStore at startup (replay());
+its pre-fork workers, which each hold their own queues, catch up with the
+games the others recorded before answering (sync()).
+"""
+
+import heapq
+import math
+import threading
+import time
+import zlib
+
+from results import INFINITIVE
+
+DAY = 86400
+EF_START = 250     # ease factor x 100
+EF_MIN = 130
+
+# state = due << 40 | interval (days) << 24 | repetitions << 16 | ease factor x 100
+def pack_state(due, interval, reps, ef):
+    return int(due) << 40 | min(interval, 0xFFFF) << 24 | min(reps, 0xFF) << 16 | ef
+
+def unpack_state(s):
+    return s >> 40, (s >> 24) & 0xFFFF, (s >> 16) & 0xFF, s & 0xFFFF
+
+def sm2(state, quality, now):
+    """The next SM-2 state of an item graded quality (0-5) at now; state None for a new item."""
+    _, interval, reps, ef = unpack_state(state) if state is not None else (0, 0, 0, EF_START)
+    if quality >= 3:
+        interval = 1 if reps == 0 else 6 if reps == 1 else math.ceil(interval * ef / 100)
+        reps += 1
+    else:
+        interval, reps = 1, 0
+    ef = max(EF_MIN, ef + 10 - (5 - quality) * (8 + (5 - quality) * 2))
+    return pack_state(now + interval * DAY, interval, reps, ef)
+
+
+class Queue:
+    """
+    One student's verbs for one direction and tense. heap holds
+    due << 24 | verb id ints (verb ids from Scheduler.ids), state maps a verb
+    id to its packed SM-2 state; cursor and size walk the verbs never played.
+    """
+    __slots__ = ("heap", "state", "cursor", "size", "start", "step")
+
+    def __init__(self, seed):
+        self.heap, self.state = [], {}
+        self.cursor = self.size = 0
+        self.start, self.step = seed, 1
+
+    def update(self, vid, state):
+        old = self.state.get(vid)
+        self.state[vid] = state
+        if old is not None and old >> 40 == state >> 40:
+            return   # same due time: the entry in the heap stays current
+        heapq.heappush(self.heap, (state >> 40) << 24 | vid)
+        if len(self.heap) > 2 * len(self.state) + 64:   # mostly stale entries: rebuild
+            self.heap = [(s >> 40) << 24 | v for v, s in self.state.items()]
+            heapq.heapify(self.heap)
+
+    def earliest(self, k, now):
+        """Up to k (verb id, due) due at now, earliest first; O(k log n)."""
+        out, keep, seen = [], [], set()
+        while self.heap and len(out) < k:
+            entry = heapq.heappop(self.heap)
+            due, vid = entry >> 24, entry & 0xFFFFFF
+            if self.state.get(vid, 0) >> 40 != due or vid in seen:
+                continue   # stale: the verb was reviewed again since (back to an earlier due time if seen)
+            seen.add(vid)
+            if due > now:
+                keep.append(entry)
+                break
+            out.append((vid, due))
+            keep.append(entry)
+        for entry in keep:
+            heapq.heappush(self.heap, entry)
+        return out
+
+    def fresh(self, pool, k, vid_of):
+        """
+        Up to k positions of pool never played, walking pool in a per-student
+        order (start + i * step mod len, step coprime with the length) that
+        needs no storage; the walk goes on where the last call stopped and
+        starts over when the pool changes size. It checks about k * m / u
+        positions for u verbs left unplayed in a pool of m, up to m when they
+        are few, and none once the queue holds m verbs.
+        """
+        m = len(pool)
+        if m != self.size:
+            self.size, self.cursor = m, 0
+            self.step = max(1, int(m * 0.618))
+            while math.gcd(self.step, m) > 1:
+                self.step += 1
+        out, left = [], m if len(self.state) < m else 0   # all played: nothing to walk
+        while left and len(out) < k:
+            i = pool[(self.start + self.cursor * self.step) % m]
+            self.cursor = (self.cursor + 1) % m
+            left -= 1
+            if vid_of(i) not in self.state:
+                out.append(i)
+        return out
+
+
+class Scheduler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues = {}   # (student, direction, tense) -> Queue
+        self.ids = {}      # verb file -> verb id
+        self.files = []    # verb id -> verb file
+        self.synced = 0    # last ResultStore rowid replayed
+        self.sync_lock = threading.Lock()
+
+    def vid(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.files)
+            self.files.append(name)
+        return i
+
+    def queue(self, student, direction, tense):
+        key = (student, direction, tense)
+        q = self.queues.get(key)
+        if q is None:
+            q = self.queues[key] = Queue(zlib.crc32(f"{student}|{tense}".encode("utf-8")))
+        return q
+
+    def next(self, deck, student, tense, n=10, now=None):
+        """
+        n verbs of deck for a game of tense (None: infinitive only): the due
+        ones first, then verbs never played, then the next to come due.
+        [(verb position, due time or None for a new verb)]. Raises KeyError for
+        a tense no verb has.
+        """
+        now = int(time.time() if now is None else now)
+        pool = deck.by_tense[tense] if tense else range(len(deck))
+        with self.lock:
+            q = self.queue(student, deck.direction, tense or INFINITIVE)
+            out = [(i, due) for vid, due in q.earliest(n, now)
+                   for i in [deck.by_file.get(self.files[vid])] if i is not None]
+            if len(out) < n:
+                out += [(i, None) for i in q.fresh(pool, n - len(out), lambda i: self.ids.get(deck.verbs[i].file))]
+            if len(out) < n:   # everything played and nothing due: the next to come due
+                seen = {i for i, _ in out}
+                out += [(i, due) for vid, due in q.earliest(n, 2**63)
+                        for i in [deck.by_file.get(self.files[vid])] if i is not None and i not in seen][:n - len(out)]
+        return out
+
+    def review(self, student, direction, tense, cards, now=None):
+        """Update the queues from one graded game: cards are (verb file, [ok per answer]) as /api/grade returns."""
+        now = int(time.time() if now is None else now)
+        for name, ok in cards:
+            if ok:
+                self.grade(student, direction, INFINITIVE, name, 5 if ok[0] else 1, now)
+            if ok[1:] and tense and tense != INFINITIVE:
+                self.grade(student, direction, tense, name, quality(len(ok[1:7]), ok[1:7].count(True)), now)
+
+    def grade(self, student, direction, tense, name, q, now):
+        """One SM-2 review of a verb file in a student's queue of tense, with quality q (0-5)."""
+        with self.lock:
+            vid = self.vid(name)
+            queue = self.queue(student, direction, tense)
+            queue.update(vid, sm2(queue.state.get(vid), q, now))
+
+    def replay(self, reviews):
+        """
+        Apply recorded reviews, oldest first: (rowid, ts, student, direction,
+        verb file, tense, asked, correct) per card and tense, as
+        ResultStore.reviews() gives them. Returns the number applied.
+        """
+        n = 0
+        for rowid, ts, student, direction, name, tense, asked, correct in reviews:
+            q = (5 if correct else 1) if tense == INFINITIVE else quality(asked, correct)
+            self.grade(student, direction, tense, name, q, ts)
+            self.synced = max(self.synced, rowid)
+            n += 1
+        return n
+
+    def sync(self, results):
+        """
+        Catch up with the reviews other processes recorded since the last
+        replay() (pre-fork serving, where each worker has its own queues).
+        """
+        with self.sync_lock:
+            return self.replay(results.reviews(self.synced))
+
+
+def quality(asked, correct):
+    """SM-2 quality of a card: 5 minus the persons missed."""
+    return max(0, 5 - (asked - correct))
@@ -6,16 +6,1018 @@ Created on Fri Aug 29 13:46:08 2025
 """
 
 # serve.py
+import argparse
+import email.utils
+import gc
+import gzip
+import hashlib
 import http.server
+import io
+import json
+import queue
+import random
+import re
+import signal
+import socket
 import socketserver
+import sys
+import threading
+import time
 import os
+import urllib.parse
+from collections import OrderedDict, namedtuple
+
+from deckstore import DeckStore
+from lexicon import Lexicon, normalize
+from metrics import Metrics
+from results import ResultStore
+from scheduler import Scheduler
 
 WEB_ROOT = os.path.dirname(os.path.abspath(__file__))
 os.chdir(WEB_ROOT)
 PORT = 8000
 
-Handler = http.server.SimpleHTTPRequestHandler
+WORKERS = 32       # threads answering requests (a kept-alive connection holds one)
+BACKLOG = 64       # accepted connections allowed to wait for a free worker
+RETRY_AFTER = 1    # seconds, sent with 503 when the wait queue is full or the BK-trees are being built
+GRACE = 10         # seconds pre-fork workers get to finish on shutdown
+QUIZ_MAX = 100     # cards per /api/quiz request
+LOOKUP_MAX = 50    # matches per /api/lookup answer
+COMPLETE_MAX = 50  # suggestions per /api/complete answer
+DIAGNOSE_MAX = 20  # near forms per /api/diagnose answer
+DIAGNOSE_K = 3     # largest edit distance /api/diagnose searches
+GRADE_MAX_KB = 256 # request body of POST /api/grade
+RESULTS_DB = "results.sqlite3"   # per-student results (see results.py); never served as a file
+PROGRESS_MAX = 100 # pairs per /api/progress answer
+IDLE_TIMEOUT = 5   # seconds a kept-alive connection may sit idle
+MAX_REQUESTS = 200 # requests per connection before it is closed
+ACCESS_LOG_FLUSH = 1.0   # seconds between writes of the buffered access log
+
+
+GZIP_LEVEL = 6
+CACHE_MB = 8       # memory cap of the static file cache
+DECK_RECHECK = 1.0 # seconds between checks for changed deck files
+
+BUNDLE_RE = re.compile(r"^/decks/([\w-]+)/bundle\.json$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# /metrics label of each endpoint; every other path is "static" (or "bundle")
+ROUTE_NAMES = {"/api/tenses": "tenses", "/api/quiz": "quiz", "/api/lookup": "lookup",
+               "/api/complete": "complete", "/api/diagnose": "diagnose", "/api/next": "next",
+               "/api/progress": "progress", "/api/grade": "grade", "/api/stats": "stats", "/metrics": "metrics"}
+
+
+def route_name(path):
+    path = path.split("?", 1)[0]
+    return ROUTE_NAMES.get(path) or ("bundle" if BUNDLE_RE.match(path) else "static")
+
+
+def accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header allows gzip (and does not give it q=0)."""
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            try:
+                return not (q.startswith("q=") and float(q[2:]) == 0)
+            except ValueError:
+                return True
+    return False
+
+
+def is_fresh(headers, etag, mtime):
+    """Conditional GET: If-None-Match wins over If-Modified-Since when both are sent."""
+    inm = headers.get("If-None-Match")
+    if inm is not None:
+        return inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]
+    ims = headers.get("If-Modified-Since")
+    if ims and mtime is not None:
+        try:
+            return int(mtime) <= email.utils.parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+    return False
+
+
+def byte_range(header, size):
+    """
+    A Range header -> (offset, length) within size bytes, () if it cannot be
+    satisfied, None to ignore it and send the whole file (not one byte range).
+    """
+    m = RANGE_RE.match(header.replace(" ", ""))
+    if not m or m.groups() == ("", ""):
+        return None
+    first, last = m.groups()
+    if not first:                                  # "-n": the last n bytes
+        n = min(int(last), size)
+        return (size - n, n) if n else ()
+    first = int(first)
+    if last and int(last) < first:
+        return None                                # "5-3" is invalid, not unsatisfiable
+    last = size - 1 if not last else min(int(last), size - 1)
+    return (first, last - first + 1) if first < size else ()
+
+
+class DeckBundles:
+    """
+    Every verb file listed in decks/<direction>/index.json, joined into one
+    JSON document: {"files": [...], "verbs": [...]}. A bundle is built from the
+    DeckStore copy of the deck and kept until the store reloads that deck
+    (index.json or a listed file changed); its ETag is the SHA-1 of the bytes.
+    A gzipped copy is made once per build.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.cache = {}   # direction -> (Deck, (body, etag, gz_body))
+        self.hits = self.builds = 0
+
+    def build(self, deck):
+        body = json.dumps({"files": deck.files, "verbs": deck.docs()}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return body, '"%s"' % hashlib.sha1(body).hexdigest(), gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+    def get(self, direction):
+        """(body, etag, gz_body) for a deck, or None if it has no index.json."""
+        deck = self.store.get(direction)
+        if deck is None:
+            return None
+        with self.lock:
+            hit = self.cache.get(direction)
+            if hit and hit[0] is deck:
+                self.hits += 1
+                return hit[1]
+            self.builds += 1
+            bundle = self.build(deck)
+            self.cache[direction] = (deck, bundle)
+            return bundle
+
+
+# one encoding of a cached file: body bytes and the headers of its 200 response
+Variant = namedtuple("Variant", "body etag headers")
+
+
+class StaticCache:
+    """
+    Bytes and precomputed response headers of static files, with their .gz
+    copy when there is a fresh one. Entries are evicted least recently used
+    first once `capacity` bytes are held; files bigger than an eighth of the
+    cap are not cached and stream from disk. Every lookup stats the file and
+    its .gz copy, so a regenerated deck is reloaded without a restart.
+    """
+    def __init__(self, capacity=CACHE_MB * 2**20):
+        self.capacity = capacity
+        self.size = 0
+        self.entries = OrderedDict()   # path -> (signature, mtime, {encoding: Variant})
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def signature(path):
+        st = os.stat(path)
+        try:
+            gz = os.stat(path + ".gz")
+            gz = (gz.st_mtime_ns, gz.st_size) if gz.st_mtime_ns >= st.st_mtime_ns else None
+        except OSError:
+            gz = None
+        return (st.st_mtime_ns, st.st_size, gz), st.st_mtime
+
+    def get(self, path, ctype):
+        """(mtime, {None: Variant, "gzip": Variant}) for a file, or None if it is too big to cache."""
+        sig, mtime = self.signature(path)
+        if sig[1] > self.capacity // 8:
+            return None
+        with self.lock:
+            hit = self.entries.get(path)
+            if hit and hit[0] == sig:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return hit[1], hit[2]
+            self.misses += 1
+        variants = {None: self.load(path, ctype, mtime, sig[2] is not None, None)}
+        if sig[2] is not None:
+            variants["gzip"] = self.load(path + ".gz", ctype, mtime, True, "gzip")
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old:
+                self.size -= sum(len(v.body) for v in old[2].values())
+            self.entries[path] = (sig, mtime, variants)
+            self.size += sum(len(v.body) for v in variants.values())
+            while self.size > self.capacity and len(self.entries) > 1:
+                _, (_, _, dropped) = self.entries.popitem(last=False)
+                self.size -= sum(len(v.body) for v in dropped.values())
+                self.evictions += 1
+        return mtime, variants
+
+    @staticmethod
+    def load(path, ctype, mtime, vary, encoding):
+        with open(path, "rb") as f:
+            body = f.read()
+            st = os.fstat(f.fileno())
+        etag = '"%x-%x%s"' % (st.st_mtime_ns, st.st_size, "-gz" if encoding else "")
+        headers = [("Content-Type", ctype),
+                   ("Content-Length", str(len(body))),
+                   ("Last-Modified", email.utils.formatdate(mtime, usegmt=True)),
+                   ("ETag", etag)]
+        if vary:
+            headers.append(("Vary", "Accept-Encoding"))
+        if encoding:
+            headers.append(("Content-Encoding", encoding))
+        return Variant(body, etag, headers)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "capacity": self.capacity,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class AccessLog:
+    """
+    The access log lines BaseHTTPRequestHandler writes to stderr, one
+    synchronous write per request. mode "buffered" queues them and a
+    background thread writes what has queued every ACCESS_LOG_FLUSH seconds;
+    "stderr" writes each line at once, "off" drops them. Errors
+    (log_error) still go straight to stderr.
+    """
+    def __init__(self, mode="buffered", stream=None):
+        self.mode = mode
+        self.stream = stream
+        self.lines = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def write(self, line):
+        if self.mode == "buffered":
+            self.lines.put(line)
+            if self.thread is None:
+                with self.lock:
+                    if self.thread is None:
+                        self.thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                        self.thread.start()
+        elif self.mode == "stderr":
+            (self.stream or sys.stderr).write(line)
+
+    def flush(self):
+        with self.lock:
+            lines = []
+            try:
+                while True:
+                    lines.append(self.lines.get_nowait())
+            except queue.Empty:
+                pass
+            if lines:
+                stream = self.stream or sys.stderr
+                stream.write("".join(lines))
+                stream.flush()
+
+    def _run(self):
+        while True:
+            time.sleep(ACCESS_LOG_FLUSH)
+            self.flush()
+
+
+DECKS = DeckStore(recheck=DECK_RECHECK)
+BUNDLES = DeckBundles(DECKS)
+LEXICON = Lexicon(DECKS)
+STATIC_CACHE = StaticCache()
+RESULTS = None     # ResultStore, opened by main()
+SCHEDULER = Scheduler()
+METRICS = Metrics()
+ACCESS_LOG = AccessLog()
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between requests, so a deck load
+    # (index.json + one file per verb) reuses a few sockets instead of one each.
+    # Every response path of SimpleHTTPRequestHandler sends Content-Length.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # headers and body go out in separate writes
+    timeout = IDLE_TIMEOUT
+    max_requests = MAX_REQUESTS
+    use_sendfile = True
+    prefork = False    # one of several worker processes (see prefork())
+    range = None       # (offset, length) of a 206 response being sent
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=WEB_ROOT, **kwargs)
+
+    def setup(self):
+        super().setup()
+        self.served = 0
+
+    def handle_one_request(self):
+        self.started = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.started is not None:   # a request line was read: count it, answered or not
+                METRICS.finished(route_name(self.path), self.status,
+                                 time.perf_counter() - self.started, self.sent)
+
+    def parse_request(self):
+        self.started = time.perf_counter()
+        self.path, self.status, self.sent = "", None, 0
+        METRICS.started()
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "content-length" and self.command != "HEAD":
+            self.sent = int(value)   # every response declares its body size
+        super().send_header(keyword, value)
+
+    def log_request(self, code="-", size="-"):
+        if ACCESS_LOG.mode != "off":
+            ACCESS_LOG.write('%s - - [%s] "%s" %s %s\n' % (self.address_string(), self.log_date_time_string(),
+                                                          self.requestline, int(code) if code != "-" else code, size))
+
+    def do_GET(self):
+        if not self.route():
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.route():
+            super().do_HEAD()
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] == "/api/grade":
+            self.api_grade()
+        else:
+            self.send_error(405, "Method not allowed")
+
+    def route(self):
+        """Answer the virtual endpoints; False lets the static file handler run."""
+        path = self.path.split("?", 1)[0]
+        m = BUNDLE_RE.match(path)
+        if m:
+            bundle = BUNDLES.get(m.group(1))
+            if bundle is None:
+                self.send_error(404, "Deck not found")
+            else:
+                self.send_bytes(*bundle, ctype="application/json; charset=utf-8")
+            return True
+        if path == "/api/tenses":
+            self.api_tenses()
+            return True
+        if path == "/api/quiz":
+            self.api_quiz()
+            return True
+        if path == "/api/lookup":
+            self.api_lookup()
+            return True
+        if path == "/api/complete":
+            self.api_complete()
+            return True
+        if path == "/api/diagnose":
+            self.api_diagnose()
+            return True
+        if path == "/api/next":
+            self.api_next()
+            return True
+        if path == "/api/progress":
+            self.api_progress()
+            return True
+        if path == "/api/stats":
+            body = json.dumps({"static_cache": STATIC_CACHE.stats()}).encode("utf-8")
+            self.send_bytes(body, ctype="application/json")
+            return True
+        if path == "/metrics":
+            body = METRICS.render(self.metrics()).encode("utf-8")
+            self.send_bytes(body, ctype="text/plain; version=0.0.4; charset=utf-8")
+            return True
+        return False
+
+    def metrics(self):
+        """The /metrics families owned by the caches and the server, next to the request metrics."""
+        caches = {"static": (STATIC_CACHE.hits, STATIC_CACHE.misses), "bundle": (BUNDLES.hits, BUNDLES.builds),
+                  "deck": (DECKS.hits, DECKS.loads), "form_index": (LEXICON.hits, LEXICON.builds)}
+        return [("serve_cache_hits_total", "counter", "Lookups answered from a cache.",
+                 [({"cache": name}, hits) for name, (hits, _) in caches.items()]),
+                ("serve_cache_misses_total", "counter", "Lookups that loaded or built the entry.",
+                 [({"cache": name}, misses) for name, (_, misses) in caches.items()]),
+                ("serve_static_cache_bytes", "gauge", "Bytes held by the static file cache.",
+                 [({}, STATIC_CACHE.size)]),
+                ("serve_static_cache_evictions_total", "counter", "Files evicted from the static cache.",
+                 [({}, STATIC_CACHE.evictions)])] + self.server.metrics()
+
+    def query(self):
+        return {k: v[-1] for k, v in urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query).items()}
+
+    def send_json(self, obj, status=200, headers=()):
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if status != 200:
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+        else:
+            self.send_bytes(body, ctype="application/json; charset=utf-8")
+
+    def deck_from_query(self, q):
+        direction = q.get("direction", "fr-it")
+        deck = DECKS.get(direction) if re.fullmatch(r"[\w-]+", direction) else None
+        if deck is None:
+            self.send_json({"error": "unknown direction"}, 404)
+        return deck
+
+    def api_tenses(self):
+        """GET /api/tenses?direction=fr-it -> {"direction", "verbs", "tenses": {"Mood|Tense": count}}"""
+        q = self.query()
+        deck = self.deck_from_query(q)
+        if deck:
+            self.send_json({"direction": deck.direction, "verbs": len(deck), "tenses": deck.tenses()})
+
+    def api_quiz(self):
+        """
+        GET /api/quiz?direction=fr-it&tense=Indicativo|Presente&n=10 -> n random
+        verbs that have that tense, each reduced to lemmas, pronouns, infinitive
+        and the forms of that one tense. Without tense, any verb (infinitive only).
+        """
+        q = self.query()
+        deck = self.deck_from_query(q)
+        if deck is None:
+            return
+        try:
+            n = max(1, min(int(q.get("n", 10)), QUIZ_MAX))
+        except ValueError:
+            return self.send_json({"error": "n must be an integer"}, 400)
+        tense = q.get("tense") or None
+        try:
+            cards = deck.quiz(tense, n)
+        except KeyError:
+            return self.send_json({"error": f"no verbs for tense {tense}"}, 404)
+        available = len(deck.by_tense[tense]) if tense else len(deck)
+        self.send_json({"direction": deck.direction, "tense": tense, "available": available, "verbs": cards})
+
+    def api_lookup(self):
+        """
+        GET /api/lookup?direction=fr-it&form=dissero -> every verb, mood, tense
+        and person (0-5, null for one-form tenses) with that form, matched
+        normalized like the app grades answers, with or without "che"/pronoun.
+        """
+        q = self.query()
+        form = q.get("form", "")
+        if not form.strip():
+            return self.send_json({"error": "form is required"}, 400)
+        deck = self.deck_from_query(q)
+        if deck is None:
+            return
+        index = LEXICON.of(deck)
+        self.send_json({"direction": deck.direction, "form": form, "normalized": normalize(form),
+                        "count": index.count(form), "matches": index.lookup(form, LOOKUP_MAX)})
+
+    def api_complete(self):
+        """
+        GET /api/complete?direction=fr-it&prefix=diss&limit=10 -> forms and
+        lemmas of the deck starting with prefix (accents and case ignored), in
+        alphabetical order: {"suggestions": [{"text", "key", "forms", "lemma"}]}.
+        """
+        q = self.query()
+        prefix = q.get("prefix", "")
+        try:
+            limit = max(1, min(int(q.get("limit", 10)), COMPLETE_MAX))
+        except ValueError:
+            return self.send_json({"error": "limit must be an integer"}, 400)
+        if not prefix.strip():
+            return self.send_json({"error": "prefix is required"}, 400)
+        deck = self.deck_from_query(q)
+        if deck is None:
+            return
+        self.send_json({"direction": deck.direction, "prefix": prefix,
+                        "suggestions": LEXICON.of(deck).complete(prefix, limit)})
+
+    def api_diagnose(self):
+        """
+        GET /api/diagnose?direction=fr-it&answer=ha andato&k=2&limit=10 -> the
+        real forms within edit distance k of a wrong answer, nearest first, with
+        the verb, mood, tense and person each belongs to:
+        {"near": [{"text", "key", "distance", "matches"}]}, or 503 while the
+        BK-trees are built (at startup, seconds at 10,000 verbs).
+        """
+        q = self.query()
+        answer = q.get("answer", "")
+        try:
+            k = max(0, min(int(q.get("k", 2)), DIAGNOSE_K))
+            limit = max(1, min(int(q.get("limit", 10)), DIAGNOSE_MAX))
+        except ValueError:
+            return self.send_json({"error": "k and limit must be integers"}, 400)
+        if not answer.strip():
+            return self.send_json({"error": "answer is required"}, 400)
+        deck = self.deck_from_query(q)
+        if deck is None:
+            return
+        index = LEXICON.of(deck)
+        if index.trees(wait=False) is None:   # building in a thread, not in this one
+            return self.send_json({"error": "the form index is being built"}, 503,
+                                  [("Retry-After", str(RETRY_AFTER))])
+        self.send_json({"direction": index.deck.direction, "answer": answer, "k": k,
+                        "near": index.near(answer, k, limit)})
+
+    def read_json(self, max_bytes):
+        """The JSON request body, or None after answering 411/413/400."""
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_json({"error": "Content-Length is required"}, 411)
+            return None
+        if length < 0:
+            self.close_connection = True   # where the body ends is unknown
+            self.send_json({"error": "Content-Length is invalid"}, 400)
+            return None
+        if length > max_bytes:
+            self.close_connection = True   # the body is left unread
+            self.send_json({"error": f"body larger than {max_bytes} bytes"}, 413)
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_json({"error": "body is not JSON"}, 400)
+            return None
+
+    def api_grade(self):
+        """
+        POST /api/grade, a whole game in one request:
+          {"direction": "fr-it", "tense": "Indicativo|Presente", "student": "...",
+           "cards": [{"file": "dire.json", "answers": [infinitive, io, tu, lui/lei, noi, voi, loro]}, ...]}
+        -> {"correct", "total", "cards": [{"file", "ok": [bool per answer], "correct", "total"}], "recorded"}.
+        Without tense only the infinitive is graded. Answers are checked against
+        the answer keys the deck's form index holds, like gradeCurrent() in app.js.
+        With a student id the results are queued for the ResultStore.
+        """
+        body = self.read_json(GRADE_MAX_KB * 1024)
+        if body is None:
+            return
+        if not isinstance(body, dict) or not isinstance(body.get("cards"), list):
+            return self.send_json({"error": "cards is required"}, 400)
+        cards, tense = body["cards"], body.get("tense") or None
+        if tense is not None and not isinstance(tense, str):
+            return self.send_json({"error": "tense must be a string"}, 400)
+        if len(cards) > QUIZ_MAX:
+            return self.send_json({"error": f"at most {QUIZ_MAX} cards"}, 400)
+        deck = self.deck_from_query({"direction": str(body.get("direction", "fr-it"))})
+        if deck is None:
+            return
+        index, out, files = LEXICON.of(deck), [], set()
+        deck = index.deck   # the deck being replaced, while its successor is indexed
+        if tense is not None and tense not in deck.by_tense:
+            return self.send_json({"error": f"no verbs for tense {tense}"}, 404)
+        for card in cards:
+            answers = card.get("answers") if isinstance(card, dict) else None
+            file = card.get("file") if isinstance(answers, list) else None
+            i = deck.by_file.get(file) if isinstance(file, str) else None
+            if i is None:
+                return self.send_json({"error": "every card needs a known file and a list of answers"}, 400)
+            if file in files:   # one review per verb and game
+                return self.send_json({"error": f"{file} is in more than one card"}, 400)
+            files.add(file)
+            ok = index.grade(i, tense, [a if isinstance(a, str) else "" for a in answers])
+            out.append({"file": card["file"], "ok": ok, "correct": sum(ok), "total": len(ok)})
+        student = body.get("student")
+        recorded = RESULTS is not None and isinstance(student, str) and 0 < len(student) <= 64
+        if recorded:
+            RESULTS.record(student, deck.direction, tense, [(c["file"], c["ok"]) for c in out])
+        if recorded and self.prefork:   # the workers' queues catch up from the database (api_next)
+            RESULTS.flush()             # so the student's next game, on any worker, sees this one
+        elif isinstance(student, str) and 0 < len(student) <= 64:
+            SCHEDULER.review(student, deck.direction, tense, [(c["file"], c["ok"]) for c in out])
+        self.send_json({"direction": deck.direction, "tense": tense, "correct": sum(c["correct"] for c in out),
+                        "total": sum(c["total"] for c in out), "cards": out, "recorded": recorded})
+
+    def api_next(self):
+        """
+        GET /api/next?direction=fr-it&student=...&tense=Indicativo|Presente&n=10
+        -> the n cards the student should play next (spaced repetition, see
+        scheduler.py): due verbs first, then new ones. Same answer as /api/quiz,
+        each card with "due" (epoch seconds, null for a new verb).
+        """
+        q = self.query()
+        student = q.get("student", "")
+        try:
+            n = max(1, min(int(q.get("n", 10)), QUIZ_MAX))
+        except ValueError:
+            return self.send_json({"error": "n must be an integer"}, 400)
+        if not 0 < len(student) <= 64:
+            return self.send_json({"error": "student is required"}, 400)
+        deck = self.deck_from_query(q)
+        if deck is None:
+            return
+        tense = q.get("tense") or None
+        if self.prefork and RESULTS is not None:
+            SCHEDULER.sync(RESULTS)   # games graded by the other workers
+        try:
+            picked = SCHEDULER.next(deck, student, tense, n)
+        except KeyError:
+            return self.send_json({"error": f"no verbs for tense {tense}"}, 404)
+        cards = [dict(deck.card(i, tense), due=due) for i, due in picked]
+        available = len(deck.by_tense[tense]) if tense else len(deck)
+        self.send_json({"direction": deck.direction, "tense": tense, "available": available, "verbs": cards})
+
+    def api_progress(self):
+        """
+        GET /api/progress?direction=fr-it&student=...&n=20 -> the n verb/tense
+        pairs the student misses most, from the games /api/grade recorded:
+        {"weakest": [{"verb", "tense", "asked", "correct"}]}.
+        """
+        q = self.query()
+        student = q.get("student", "")
+        try:
+            n = max(1, min(int(q.get("n", 20)), PROGRESS_MAX))
+        except ValueError:
+            return self.send_json({"error": "n must be an integer"}, 400)
+        if not student:
+            return self.send_json({"error": "student is required"}, 400)
+        if RESULTS is None:
+            return self.send_json({"error": "results are not recorded by this server"}, 404)
+        deck = self.deck_from_query(q)
+        if deck is None:
+            return
+        self.send_json({"direction": deck.direction, "student": student,
+                        "weakest": RESULTS.weakest(student, deck.direction, n)})
+
+    def send_bytes(self, body, etag=None, gz_body=None, ctype="application/octet-stream"):
+        """Send an in-memory body (gzipped if offered and accepted), or 304 when the client already has it."""
+        gz = gz_body is not None and accepts_gzip(self.headers.get("Accept-Encoding"))
+        if gz:
+            body, etag = gz_body, etag and etag[:-1] + '-gz"'
+        if etag and is_fresh(self.headers, etag, None):
+            self.send_not_modified(etag)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if gz_body is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")   # always revalidate, 304 is cheap
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_head(self):
+        """
+        Static files, from STATIC_CACHE when they fit, else streamed from disk.
+        The pre-compressed <file>.gz written by CompressAssets.py is sent instead
+        when the client accepts gzip and the copy is not stale. Responses carry
+        ETag and Last-Modified and become 304 on a matching If-None-Match /
+        If-Modified-Since. A Range request gets 206 with one byte range of the
+        uncompressed file (416 when it is past the end; a stale If-Range, or
+        several ranges, get the whole file). Redirects, listings and 404s are
+        left to SimpleHTTPRequestHandler.
+        """
+        self.range = None
+        path = self.translate_path(self.path)
+        if RESULTS is not None and os.path.abspath(path).startswith(os.path.abspath(RESULTS.path)):
+            self.send_error(404, "File not found")   # the database and its -wal / -shm files
+            return None
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            return super().send_head()
+        if self.headers.get("Range"):
+            return self.send_from_disk(path)   # ranges of the file itself, never of its .gz copy
+        try:
+            cached = STATIC_CACHE.get(path, self.guess_type(path))
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        if cached is None:
+            return self.send_from_disk(path)
+        mtime, variants = cached
+        gz = "gzip" in variants and accepts_gzip(self.headers.get("Accept-Encoding"))
+        variant = variants["gzip" if gz else None]
+        if is_fresh(self.headers, variant.etag, mtime):
+            self.send_not_modified(variant.etag)
+            return None
+        self.send_response(200)
+        for name, value in variant.headers:
+            self.send_header(name, value)
+        self.end_headers()
+        return io.BytesIO(variant.body)
+
+    def send_from_disk(self, path):
+        """Headers for a file streamed from disk; copyfile() then sends it (or self.range of it)."""
+        ctype = self.guess_type(path)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        try:
+            fs = os.fstat(f.fileno())
+            encoding = None
+            has_gz = False
+            ranged = bool(self.headers.get("Range"))
+            if os.path.isfile(path + ".gz"):
+                gs = os.stat(path + ".gz")
+                has_gz = gs.st_mtime >= fs.st_mtime
+                if has_gz and not ranged and accepts_gzip(self.headers.get("Accept-Encoding")):
+                    f.close()
+                    f = open(path + ".gz", "rb")
+                    fs, encoding = os.fstat(f.fileno()), "gzip"
+            etag = '"%x-%x%s"' % (fs.st_mtime_ns, fs.st_size, "-gz" if encoding else "")
+            if is_fresh(self.headers, etag, fs.st_mtime):
+                f.close()
+                self.send_not_modified(etag)
+                return None
+            last_modified = self.date_time_string(fs.st_mtime)
+            if ranged and self.headers.get("If-Range", etag) in (etag, last_modified):
+                self.range = byte_range(self.headers["Range"], fs.st_size)
+            if self.range == ():
+                f.close()
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{fs.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            if self.range:
+                start, count = self.range
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{start + count - 1}/{fs.st_size}")
+            else:
+                count = fs.st_size
+                self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(count))
+            self.send_header("Last-Modified", last_modified)
+            self.send_header("ETag", etag)
+            self.send_header("Accept-Ranges", "bytes")
+            if has_gz:
+                self.send_header("Vary", "Accept-Encoding")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        """
+        A file from disk goes out with socket.sendfile(), i.e. os.sendfile()
+        where the platform has it: the kernel copies the pages to the socket,
+        no Python buffers. socket.sendfile() itself falls back to send() when
+        it cannot (no os.sendfile, TLS socket); --no-sendfile and in-memory
+        bodies use the copy loop.
+        """
+        start, count = self.range or (0, None)
+        if self.use_sendfile and isinstance(source, io.BufferedReader) and \
+                outputfile is self.wfile and self.wbufsize == 0:   # wfile writes straight to the socket
+            self.connection.sendfile(source, start, count)
+            return
+        if not self.range:
+            return super().copyfile(source, outputfile)
+        source.seek(start)
+        while count:
+            buf = source.read(min(count, 64 * 1024))
+            if not buf:
+                break
+            outputfile.write(buf)
+            count -= len(buf)
+
+    def send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+    def end_headers(self):
+        self.served += 1
+        if not self.close_connection:
+            # a kept-alive socket holds its worker, so give it back when others are queued
+            if self.served >= self.max_requests or self.server.busy():
+                self.send_header("Connection", "close")
+            else:
+                self.send_header("Keep-Alive", f"timeout={self.timeout:g}, max={self.max_requests - self.served}")
+        super().end_headers()
+
+
+class PooledTCPServer(socketserver.TCPServer):
+    """
+    TCPServer that hands accepted connections to a fixed pool of worker threads
+    instead of answering them one by one. At most `backlog` connections wait for
+    a worker; beyond that the client gets a 503 with Retry-After right away.
+    """
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, workers=WORKERS, backlog=BACKLOG, sock=None):
+        self.request_queue_size = max(backlog, 5)   # listen() backlog
+        self.pending = queue.Queue(maxsize=backlog)
+        self.rejected = 0
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        super().__init__(address, handler, bind_and_activate=sock is None)
+        if sock is not None:   # a listening socket shared with other processes
+            self.socket.close()
+            self.socket = sock
+            self.server_address = sock.getsockname()
+        for t in self.workers:
+            t.start()
+
+    def busy(self):
+        return not self.pending.empty()
+
+    def metrics(self):
+        return [("serve_queued_connections", "gauge", "Accepted connections waiting for a worker thread.",
+                 [({}, self.pending.qsize())]),
+                ("serve_rejected_connections_total", "counter", "Connections answered 503 as the wait queue was full.",
+                 [({}, self.rejected)])]
+
+    def process_request(self, request, client_address):
+        try:
+            self.pending.put_nowait((request, client_address))
+        except queue.Full:
+            self.reject(request)
+
+    def _work(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def reject(self, request):
+        self.rejected += 1
+        body = b"Server busy, please retry.\n"
+        head = ("HTTP/1.1 503 Service Unavailable\r\n"
+                f"Retry-After: {RETRY_AFTER}\r\n"
+                "Content-Type: text/plain; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n").encode("ascii")
+        try:
+            request.settimeout(0)
+            try:
+                request.recv(65536)   # drain the request so close() does not reset the reply
+            except OSError:
+                pass
+            request.settimeout(1)
+            request.sendall(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self.workers:
+            self.pending.put(None)
+
+
+def make_server(port=PORT, workers=WORKERS, backlog=BACKLOG, host="", sock=None):
+    return PooledTCPServer((host, port), Handler, workers=workers, backlog=backlog, sock=sock)
+
+
+def serve(httpd, graceful):
+    """serve_forever() until SIGTERM/SIGINT, then answer the accepted requests and stop."""
+    def stop(signum, frame):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()   # shutdown() waits for serve_forever()
+    if graceful:
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+    try:
+        httpd.serve_forever()
+        httpd.server_close()      # no more accepts; each thread ends after the queued requests
+        for t in httpd.workers:
+            t.join(Handler.timeout + 1)
+    finally:
+        if RESULTS is not None:
+            RESULTS.close()       # commit the games still queued
+        ACCESS_LOG.flush()
+
+
+def worker(sock, args):
+    """One pre-forked process: its own request threads and results writer, the parent's decks."""
+    global RESULTS
+    random.seed()                 # not the parent's quiz sequence
+    Handler.prefork = True
+    RESULTS = ResultStore(args.results) if args.results else None
+    serve(make_server(args.port, args.workers, args.backlog, sock=sock), graceful=True)
+
+
+def prefork(args):
+    """
+    Fork args.processes workers that accept from one listening socket, and
+    supervise them: a worker that dies is replaced (after a second if it
+    died within a second of starting), SIGTERM/SIGINT stop them gracefully
+    (SIGKILL after GRACE seconds). The decks, form indexes and scheduler
+    queues are loaded before the fork and shared copy-on-write; gc.freeze()
+    keeps the collector from touching, and so copying, their pages.
+    """
+    sock = socket.create_server(("", args.port), backlog=max(args.backlog, 5))
+    sock.setblocking(False)       # a connection another worker took makes accept() fail, not block
+    gc.freeze()
+    children, stopping = {}, []   # pid -> start time
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                worker(sock, args)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.processes):
+        spawn()
+    print(f"Serving at http://localhost:{args.port} with {args.processes} processes")
+    deadline = None
+    while children:
+        if stopping and deadline is None:
+            deadline = time.monotonic() + GRACE
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                for pid in children:
+                    os.kill(pid, signal.SIGKILL)
+            time.sleep(0.1)
+            continue
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"worker {pid} exited with status {status}, restarting", file=sys.stderr)
+        if time.monotonic() - started < 1:
+            time.sleep(1)         # crashing at startup: do not spin
+        spawn()
+    sock.close()
+
+
+def load(args, trees=False):
+    """
+    Startup shared with aserve.py: size the static cache, load the decks and
+    their form indexes (BK-trees now if trees, else in the background), open
+    RESULTS from args.results and rebuild the scheduler's queues from it.
+    """
+    global RESULTS
+    STATIC_CACHE.capacity = int(args.cache_mb * 2**20)
+    for direction in sorted(os.listdir(DECKS.root)):   # load decks and their form index before serving
+        index = LEXICON.get(direction)
+        if index is not None:   # /api/diagnose answers 503 until its BK-trees are built
+            index.trees(wait=trees)
+    RESULTS = ResultStore(args.results) if args.results else None
+    if RESULTS is not None:   # the scheduler's queues are rebuilt from the recorded answers
+        print(f"Replayed {SCHEDULER.replay(RESULTS.reviews())} recorded reviews.")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve the flashcards app.")
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--workers", type=int, default=WORKERS, help="size of the worker pool")
+    ap.add_argument("--backlog", type=int, default=BACKLOG, help="connections allowed to wait for a worker")
+    ap.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds before an idle connection is closed")
+    ap.add_argument("--max-requests", type=int, default=MAX_REQUESTS, help="requests served per connection")
+    ap.add_argument("--cache-mb", type=float, default=CACHE_MB, help="memory cap of the static file cache")
+    ap.add_argument("--no-sendfile", action="store_true", help="copy static files through Python buffers")
+    ap.add_argument("--results", default=RESULTS_DB, metavar="PATH",
+                    help="SQLite file of per-student results (empty: do not record)")
+    ap.add_argument("--processes", type=int, default=1,
+                    help="worker processes sharing the port (pre-fork; needs os.fork)")
+    ap.add_argument("--access-log", choices=("buffered", "stderr", "off"), default="buffered",
+                    help="access log to stderr, written every second (buffered) or per request")
+    args = ap.parse_args(argv)
+    ACCESS_LOG.mode = args.access_log
+    Handler.timeout = args.idle_timeout
+    Handler.max_requests = args.max_requests
+    Handler.use_sendfile = not args.no_sendfile
+    forking = args.processes > 1
+    load(args, trees=forking)   # BK-trees built once, before the fork
+
+    if forking:
+        if RESULTS is not None:
+            RESULTS.close()     # each worker opens its own: no SQLite connection crosses a fork
+        return prefork(args)
+    httpd = make_server(args.port, args.workers, args.backlog)
+    print(f"Serving at http://localhost:{args.port}")
+    serve(httpd, graceful=False)
+
 
-with socketserver.TCPServer(("", PORT), Handler) as httpd:
-    print(f"Serving at http://localhost:{PORT}")
-    httpd.serve_forever()
+if __name__ == "__main__":
+    main()